@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'users',
     'documents',
     'chat',
+    'usage',
 
 ]
 
@@ -131,6 +132,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are hashed while streaming (see documents.uploads) before the
+# default handlers buffer them in memory or a temporary file
+FILE_UPLOAD_HANDLERS = [
+    'documents.uploads.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 AUTH_USER_MODEL = 'users.User'
 
 # Default primary key field type
@@ -143,6 +152,125 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
 PINECONE_ENV = os.getenv('PINECONE_ENV')
 
+# Name of the first vector index. Afterwards the ACTIVE VectorIndex row is
+# the read pointer (switched by `manage.py rebuild_index cutover`); processes
+# re-read it at most every VECTOR_INDEX_POINTER_TTL seconds.
+PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME', 'axonflow-documents')
+VECTOR_INDEX_POINTER_TTL = float(os.getenv('VECTOR_INDEX_POINTER_TTL', '5'))
+
+# OpenAI rate limiting: budgets shared by every worker via Redis when
+# OPENAI_RATE_LIMIT_REDIS_URL is set (in-memory per process otherwise).
+# OPENAI_BULK_RESERVE is the budget fraction ingestion leaves free for chat.
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '3000'))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '1000000'))
+OPENAI_BULK_RESERVE = float(os.getenv('OPENAI_BULK_RESERVE', '0.2'))
+OPENAI_RATE_LIMIT_REDIS_URL = os.getenv('OPENAI_RATE_LIMIT_REDIS_URL', '')
+OPENAI_RATE_LIMIT_TIMEOUT = float(os.getenv('OPENAI_RATE_LIMIT_TIMEOUT', '60'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '5'))
+# Per-request timeout (seconds); also bounds how long abandoned hedged calls run
+OPENAI_REQUEST_TIMEOUT = float(os.getenv('OPENAI_REQUEST_TIMEOUT', '60'))
+
+# Embeddings: EMBEDDING_DIMENSION below the model's native size shortens
+# vectors (text-embedding-3-* only); 0 uses the native size. One Pinecone
+# index only ever holds vectors of a single model and dimension.
+OPENAI_EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002')
+EMBEDDING_DIMENSION = int(os.getenv('EMBEDDING_DIMENSION', '0'))
+
+# Per-user daily token quota across all OpenAI calls (0 = unlimited)
+USER_DAILY_TOKEN_QUOTA = int(os.getenv('USER_DAILY_TOKEN_QUOTA', '0'))
+
+# Pinecone upserts: batches are capped by vector count and serialized size
+# (the API rejects request bodies over 2MB), with bounded parallel requests
+PINECONE_UPSERT_BATCH_SIZE = int(os.getenv('PINECONE_UPSERT_BATCH_SIZE', '100'))
+PINECONE_UPSERT_MAX_BYTES = int(os.getenv('PINECONE_UPSERT_MAX_BYTES', str(2 * 1024 * 1024 - 64 * 1024)))
+PINECONE_UPSERT_CONCURRENCY = int(os.getenv('PINECONE_UPSERT_CONCURRENCY', '4'))
+PINECONE_UPSERT_MAX_RETRIES = int(os.getenv('PINECONE_UPSERT_MAX_RETRIES', '3'))
+
+# Retrieval: over-fetch RAG_FETCH_K matches, then keep RAG_CONTEXT_K diverse
+# ones via Maximal Marginal Relevance (lambda 1.0 = relevance only)
+RAG_FETCH_K = int(os.getenv('RAG_FETCH_K', '20'))
+RAG_CONTEXT_K = int(os.getenv('RAG_CONTEXT_K', '4'))
+RAG_MMR_LAMBDA = float(os.getenv('RAG_MMR_LAMBDA', '0.7'))
+# Multi-query retrieval: embed and search up to RAG_MAX_QUERY_VARIANTS
+# variants of the message (history-aware rewrite, sub-questions) in parallel,
+# each coalesced and hedged like a single query, and merge them with
+# reciprocal rank fusion (RAG_RRF_K damps the rank weights)
+RAG_MULTI_QUERY = os.getenv('RAG_MULTI_QUERY', 'True') == 'True'
+RAG_MAX_QUERY_VARIANTS = int(os.getenv('RAG_MAX_QUERY_VARIANTS', '4'))
+RAG_RRF_K = int(os.getenv('RAG_RRF_K', '60'))
+
+# Summary trees built after ingestion: SUMMARY_GROUP_SIZE consecutive chunks
+# per group summary, SUMMARY_SECTION_SIZE group summaries per section, then
+# one document summary (SUMMARY_SECTION_SIZE below 2 is treated as 2).
+# Overview questions ("summarize this document") about up to
+# SUMMARY_OVERVIEW_MAX_DOCUMENTS documents are answered from them.
+DOCUMENT_SUMMARIES = os.getenv('DOCUMENT_SUMMARIES', 'True') == 'True'
+SUMMARY_GROUP_SIZE = int(os.getenv('SUMMARY_GROUP_SIZE', '8'))
+SUMMARY_SECTION_SIZE = int(os.getenv('SUMMARY_SECTION_SIZE', '6'))
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '4'))
+SUMMARY_OVERVIEW_MAX_DOCUMENTS = int(os.getenv('SUMMARY_OVERVIEW_MAX_DOCUMENTS', '5'))
+
+# Speculative retrieval while the user types: drafts of at least
+# CHAT_PREFETCH_MIN_CHARS are embedded and searched, cached for
+# CHAT_PREFETCH_TTL seconds per chat session
+CHAT_PREFETCH_MIN_CHARS = int(os.getenv('CHAT_PREFETCH_MIN_CHARS', '12'))
+CHAT_PREFETCH_TTL = int(os.getenv('CHAT_PREFETCH_TTL', '60'))
+
+# Chat turn deadline (seconds, the SRS response-time target). Embedding and
+# vector query may each use at most their fraction of it; the completion gets
+# whatever is left. Slow idempotent calls are hedged at their observed p95.
+CHAT_TURN_BUDGET = float(os.getenv('CHAT_TURN_BUDGET', '5.0'))
+CHAT_STAGE_BUDGETS = {
+    'embedding': float(os.getenv('CHAT_EMBEDDING_BUDGET', '0.2')),
+    'vector_query': float(os.getenv('CHAT_VECTOR_QUERY_BUDGET', '0.2')),
+}
+CHAT_STAGE_WORKERS = int(os.getenv('CHAT_STAGE_WORKERS', '32'))
+
+# Per-user session list and sidebar cache (seconds); invalidated by signals
+# on every session change, the TTL only bounds memory use
+CHAT_SESSION_CACHE_TTL = int(os.getenv('CHAT_SESSION_CACHE_TTL', '3600'))
+
+# Shared cache: set CACHE_REDIS_URL when running several workers so that
+# invalidations and prefetched context are seen by all of them
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+
+# Warm API clients and verify the index in the background when the app
+# loads (enable on web workers). Otherwise a worker warms on its first
+# /health/ready/ probe; `manage.py warmup` only checks the upstream services
+# from its own process and does not make a running worker ready
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP') == 'True'
+
+# Document ingestion progress (seconds). Each open progress stream holds a
+# sync worker (sleeping between polls) for up to the stream timeout; the
+# browser then reconnects, so a short window frees workers without ending
+# progress updates for long ingestions
+DOCUMENT_PROGRESS_POLL_INTERVAL = float(os.getenv('DOCUMENT_PROGRESS_POLL_INTERVAL', '1.0'))
+DOCUMENT_PROGRESS_STREAM_TIMEOUT = float(os.getenv('DOCUMENT_PROGRESS_STREAM_TIMEOUT', '30'))
+# A PROCESSING (or paused) document with no progress for this long is treated
+# as stalled (e.g. its worker died) and may be retried from its checkpoint;
+# never while a circuit breaker is open, as ingestion then waits without progress
+DOCUMENT_STALE_AFTER = int(os.getenv('DOCUMENT_STALE_AFTER', '600'))
+
+# Circuit breakers for OpenAI and Pinecone: a dependency's circuit opens when
+# at least MIN_CALLS of its last WINDOW calls were made and FAILURE_RATE of
+# them failed (calls slower than SLOW_CALL_SECONDS count as failures). While
+# open, ingestion pauses; after COOLDOWN seconds one probe call is let through.
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv('CIRCUIT_BREAKER_FAILURE_RATE', '0.5'))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv('CIRCUIT_BREAKER_MIN_CALLS', '10'))
+CIRCUIT_BREAKER_WINDOW = int(os.getenv('CIRCUIT_BREAKER_WINDOW', '50'))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '30'))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = {
+    'openai': float(os.getenv('OPENAI_SLOW_CALL_SECONDS', '30')),
+    'pinecone': float(os.getenv('PINECONE_SLOW_CALL_SECONDS', '10')),
+}
+
 # Login/Logout redirects
 LOGIN_REDIRECT_URL = 'document_list'
 LOGOUT_REDIRECT_URL = 'login'
@@ -18,9 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from documents.views import circuits, readiness
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('health/ready/', readiness, name='readiness'),
+    path('health/circuits/', circuits, name='circuits'),
     path('accounts/', include('django.contrib.auth.urls')),
     path('users/', include('users.urls')),
     path('documents/', include('documents.urls')),
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ChatConfig(AppConfig):
     name = 'chat'
+
+    def ready(self):
+        # Keeps the cached session list in step with session changes
+        from . import signals  # noqa: F401
@@ -0,0 +1,236 @@
+"""
+Turn Deadlines for AxonFlow AI
+Per-stage time budgets and hedged requests for the chat path
+"""
+
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional
+from django.conf import settings
+import contextvars
+import threading
+import time
+
+
+class StageTimeout(Exception):
+    """A stage did not finish within its share of the turn budget"""
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent latencies per stage
+
+    Percentiles are only reported once a stage has enough samples, so
+    hedging does not kick in on a cold process's guesses.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def percentile(self, stage: str, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of the stage's recent latencies, in seconds"""
+        with self._lock:
+            samples = sorted(self._samples[stage])
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(int(len(samples) * q / 100), len(samples) - 1)]
+
+
+latency_tracker = LatencyTracker()
+
+# Marks calls of a gather that failed or did not finish (None is a valid result)
+_FAILED = object()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.CHAT_STAGE_WORKERS,
+                    thread_name_prefix='chat-stage'
+                )
+    return _executor
+
+
+def _timed(stage: str, func: Callable[[], Any]) -> Any:
+    started = time.monotonic()
+    result = func()
+    latency_tracker.record(stage, time.monotonic() - started)
+    return result
+
+
+def _submit(stage: str, func: Callable[[], Any]):
+    """Run func on the stage pool in a copy of the caller's context (keeps usage attribution)"""
+    return _get_executor().submit(contextvars.copy_context().run, _timed, stage, func)
+
+
+def gather(stage: str, funcs: List[Callable[[], Any]], timeout: Optional[float] = None,
+           hedges: Optional[List[Callable[[], Any]]] = None, hedge_after: Optional[float] = None) -> List[Any]:
+    """
+    Run independent calls of one stage concurrently on the stage pool
+
+    With `hedges` and `hedge_after`, each call still running after
+    `hedge_after` seconds gets its hedge started too, and the first of the
+    two to succeed is its result.
+
+    Args:
+        stage: Stage name, used for latency tracking
+        funcs: Calls to run
+        timeout: Seconds to wait for all of them (None = no limit)
+        hedges: Duplicate of each call that bypasses request coalescing
+        hedge_after: Seconds after which slow calls are hedged
+
+    Returns:
+        One result per call, None for calls that failed or did not finish
+
+    Raises:
+        StageTimeout: If no call succeeded in time
+    """
+    started = time.monotonic()
+    calls = [[_submit(stage, func)] for func in funcs]
+
+    if hedges is not None and hedge_after is not None and (timeout is None or hedge_after < timeout):
+        wait([attempts[0] for attempts in calls], timeout=hedge_after)
+        for attempts, hedge in zip(calls, hedges):
+            if not attempts[0].done():
+                attempts.append(_submit(stage, hedge))
+
+    def outcome(attempts):
+        for future in attempts:
+            if future.done() and future.exception() is None:
+                return future.result()
+        return _FAILED
+
+    def settled(attempts):
+        return outcome(attempts) is not _FAILED or all(future.done() for future in attempts)
+
+    while True:
+        pending = [future for attempts in calls if not settled(attempts) for future in attempts if not future.done()]
+        if not pending:
+            break
+        remaining = None if timeout is None else timeout - (time.monotonic() - started)
+        if remaining is not None and remaining <= 0:
+            break
+        wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+    results = [outcome(attempts) for attempts in calls]
+    errors = [
+        future.exception() for attempts in calls for future in attempts
+        if future.done() and future.exception() is not None
+    ]
+
+    if all(result is _FAILED for result in results):
+        if errors and all(settled(attempts) for attempts in calls):
+            raise errors[-1]
+        within = f" within {timeout:.2f}s" if timeout is not None else ""
+        raise StageTimeout(f"{stage} did not finish{within}")
+    return [None if result is _FAILED else result for result in results]
+
+
+class Deadline:
+    """
+    Time budget of one chat turn, shared out across its stages
+
+    Each stage may use at most its configured fraction of the whole budget
+    (CHAT_STAGE_BUDGETS) and never more than what is left, so a slow early
+    stage shrinks the later ones instead of extending the turn.
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.started = time.monotonic()
+
+    def remaining(self) -> float:
+        return max(self.budget - (time.monotonic() - self.started), 0.0)
+
+    def stage_budget(self, stage: str) -> float:
+        share = settings.CHAT_STAGE_BUDGETS.get(stage, 1.0)
+        return min(self.budget * share, self.remaining())
+
+    def run(self, stage: str, func: Callable[[], Any], hedge: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Run a stage within its budget, optionally hedged
+
+        When `hedge` is given (idempotent calls only) and the primary call is
+        still running at the stage's observed p95, the hedge is started too
+        and whichever finishes first wins. The loser keeps running in the
+        background; its result is discarded.
+
+        Args:
+            stage: Stage name, used for budgets and latency tracking
+            func: Primary call
+            hedge: Duplicate of the call that bypasses request coalescing
+
+        Returns:
+            Result of the first call to succeed
+
+        Raises:
+            StageTimeout: If no call succeeded within the stage's budget
+        """
+        timeout = self.stage_budget(stage)
+        if timeout <= 0:
+            raise StageTimeout(f"No time left for {stage}")
+
+        started = time.monotonic()
+        pending = {_submit(stage, func)}
+
+        hedge_after = latency_tracker.percentile(stage, 95)
+        if hedge is not None and hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(pending, timeout=hedge_after)
+            if not done:
+                pending.add(_submit(stage, hedge))
+
+        error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+
+        if error is not None and not pending:
+            raise error
+        raise StageTimeout(f"{stage} did not finish within {timeout:.2f}s")
+
+    def run_all(self, stage: str, funcs: List[Callable[[], Any]],
+                hedges: Optional[List[Callable[[], Any]]] = None) -> List[Any]:
+        """
+        Run independent calls of one stage concurrently within its budget
+
+        The calls share the stage's budget instead of each getting their
+        own, so fanning out does not lengthen the turn. Calls still running
+        at the budget are abandoned (their results discarded). With
+        `hedges`, calls still running at the stage's observed p95 are
+        hedged as in run().
+
+        Returns:
+            One result per call, None for calls that failed or ran over
+
+        Raises:
+            StageTimeout: If no call succeeded within the budget
+        """
+        timeout = self.stage_budget(stage)
+        if timeout <= 0:
+            raise StageTimeout(f"No time left for {stage}")
+        return gather(
+            stage,
+            funcs,
+            timeout=timeout,
+            hedges=hedges,
+            hedge_after=latency_tracker.percentile(stage, 95)
+        )
@@ -0,0 +1,266 @@
+"""
+Chat Load-Test Harness for AxonFlow AI
+Synthetic users, latency-injecting API stand-ins and per-stage percentiles
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+import hashlib
+import json
+import math
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from documents.openai_client import embedding_config
+
+
+class LatencyModel:
+    """
+    Log-normal latency distribution described by its median and p95
+
+    Log-normal matches the long right tail typical of remote API calls.
+    """
+
+    def __init__(self, median_ms: float, p95_ms: float):
+        self.mu = math.log(max(median_ms, 0.001))
+        self.sigma = max(math.log(max(p95_ms, median_ms) / max(median_ms, 0.001)) / 1.645, 0.0)
+
+    @classmethod
+    def parse(cls, spec: str) -> 'LatencyModel':
+        """Parse 'median,p95' in milliseconds, e.g. '120,400'"""
+        median, p95 = (float(part) for part in spec.split(','))
+        return cls(median, p95)
+
+    def sample_seconds(self) -> float:
+        return random.lognormvariate(self.mu, self.sigma) / 1000.0
+
+
+class StageTimer:
+    """Thread-safe collector of latency samples per stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)
+        self._errors = defaultdict(int)
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def error(self, stage: str):
+        with self._lock:
+            self._errors[stage] += 1
+
+    def report(self) -> Dict[str, Dict]:
+        """p50/p95/p99/max in milliseconds, count and errors for each stage"""
+        with self._lock:
+            stages = set(self._samples) | set(self._errors)
+            report = {}
+            for stage in sorted(stages):
+                samples = np.asarray(self._samples.get(stage, []), dtype=np.float64) * 1000
+                row = {'count': int(samples.size), 'errors': self._errors.get(stage, 0)}
+                if samples.size:
+                    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+                    row.update(p50=p50, p95=p95, p99=p99, max=float(samples.max()))
+                report[stage] = row
+            return report
+
+    def fraction_under(self, stage: str, seconds: float) -> Optional[float]:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if not samples:
+                return None
+            return sum(1 for sample in samples if sample <= seconds) / len(samples)
+
+
+class StandInOpenAIClient:
+    """Replaces OpenAIClient for load tests: sleeps instead of calling the API"""
+
+    def __init__(self, timer: StageTimer, embedding_latency: LatencyModel, completion_latency: LatencyModel):
+        self.timer = timer
+        self.embedding_latency = embedding_latency
+        self.completion_latency = completion_latency
+        self.embedding_model, self.dimension = embedding_config()
+
+    def create_embedding(self, text: str, coalesce: bool = True) -> np.ndarray:
+        delay = self.embedding_latency.sample_seconds()
+        time.sleep(delay)
+        self.timer.add('embedding', delay)
+        return self._vector(text)
+
+    def _vector(self, text: str) -> np.ndarray:
+        # Deterministic per text so repeated questions behave like the real API
+        seed = int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:4], 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def generate_rag_response(self, query: str, context_chunks: List[str], conversation_history=None,
+                              max_tokens: int = 1000) -> str:
+        delay = self.completion_latency.sample_seconds()
+        time.sleep(delay)
+        self.timer.add('completion', delay)
+        return f"Stand-in answer using {len(context_chunks)} context chunks."
+
+
+class StandInPineconeClient:
+    """Replaces PineconeClient for load tests: returns synthetic matches after a delay"""
+
+    def __init__(self, timer: StageTimer, query_latency: LatencyModel):
+        self.timer = timer
+        self.query_latency = query_latency
+        self.dimension = embedding_config()[1]
+
+    def query_vectors(self, query_vector, top_k=5, filter_dict=None, namespace='', include_values=False,
+                      coalesce=True):
+        delay = self.query_latency.sample_seconds()
+        time.sleep(delay)
+        self.timer.add('vector_query', delay)
+
+        rng = np.random.default_rng()
+        matches = []
+        for i in range(top_k):
+            match = {
+                'id': f"doc_0_chunk_{i}",
+                'score': 0.9 - i * 0.01,
+                'metadata': {
+                    'document_id': 0,
+                    'document_title': 'Load test document',
+                    'chunk_index': i,
+                    'page_start': i + 1,
+                    'page_end': i + 1,
+                    'text': f"Synthetic context passage {i}.",
+                },
+            }
+            if include_values:
+                # Plain lists, as the real client returns them
+                match['values'] = rng.standard_normal(self.dimension).astype(np.float32).tolist()
+            matches.append(match)
+        return matches
+
+
+class SyntheticUser:
+    """One simulated browser: its own cookie jar, login and chat session"""
+
+    def __init__(self, base_url: str, username: str, password: str, timer: StageTimer):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.timer = timer
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.session_id = None
+
+    def _csrf_token(self) -> str:
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def _timed(self, stage: str, request: urllib.request.Request):
+        started = time.monotonic()
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                body = response.read()
+                final_url = response.geturl()
+        except Exception:
+            self.timer.error(stage)
+            raise
+        self.timer.add(stage, time.monotonic() - started)
+        return body, final_url
+
+    def log_in(self):
+        login_url = f"{self.base_url}/accounts/login/"
+        self.opener.open(login_url, timeout=60).read()
+        form = urlencode({
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': self._csrf_token(),
+        }).encode()
+        self._timed('login', urllib.request.Request(login_url, data=form, headers={'Referer': login_url}))
+
+    def open_session(self):
+        _, final_url = self._timed('open_session', urllib.request.Request(f"{self.base_url}/chat/new/"))
+        self.session_id = int(re.search(r'/chat/session/(\d+)/', final_url).group(1))
+
+    def send_message(self, message: str):
+        url = f"{self.base_url}/chat/session/{self.session_id}/send/"
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({'message': message}).encode(),
+            headers={
+                'Content-Type': 'application/json',
+                'X-CSRFToken': self._csrf_token(),
+                'Referer': url,
+            },
+        )
+        body, _ = self._timed('send_message', request)
+        data = json.loads(body)
+        if not data.get('success'):
+            self.timer.error('send_message_rejected')
+        elif data.get('degraded'):
+            self.timer.error('send_message_degraded')
+
+
+QUESTIONS = [
+    "What are the main findings of the report?",
+    "Summarize the key requirements in section 3.",
+    "Which risks are mentioned for the deployment?",
+    "What does the document say about data retention?",
+    "List the performance targets.",
+]
+
+
+def run_load(users: List[SyntheticUser], rate: float, duration: float, timer: StageTimer) -> Dict:
+    """
+    Drive the synthetic population with Poisson arrivals
+
+    Arrivals are open-loop: a message is due every Exp(rate) seconds whether
+    or not earlier ones finished. Each arrival waits for an idle user (time
+    recorded as 'queue_wait') so a single user never has two turns in flight.
+
+    Args:
+        users: Logged-in users with open sessions
+        rate: Mean messages per second across the population
+        duration: Seconds to keep generating arrivals
+        timer: Collector for per-stage latencies
+
+    Returns:
+        {'arrivals': int, 'elapsed': float}
+    """
+    idle = queue.Queue()
+    for user in users:
+        idle.put(user)
+
+    def turn(due: float):
+        user = idle.get()
+        timer.add('queue_wait', max(time.monotonic() - due, 0.0))
+        try:
+            user.send_message(random.choice(QUESTIONS))
+        except Exception:
+            pass
+        finally:
+            idle.put(user)
+
+    arrivals = 0
+    started = time.monotonic()
+    next_arrival = started
+
+    with ThreadPoolExecutor(max_workers=max(len(users), 1)) as executor:
+        while True:
+            next_arrival += random.expovariate(rate)
+            if next_arrival - started > duration:
+                break
+            time.sleep(max(next_arrival - time.monotonic(), 0.0))
+            executor.submit(turn, next_arrival)
+            arrivals += 1
+
+    return {'arrivals': arrivals, 'elapsed': time.monotonic() - started}
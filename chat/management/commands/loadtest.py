@@ -0,0 +1,172 @@
+"""
+End-to-end load test of the chat path against a throwaway test server
+
+Usage:
+    python manage.py loadtest [--users 20] [--rate 2] [--duration 60]
+        [--embedding-latency 80,250] [--query-latency 40,150] [--completion-latency 1500,4000]
+
+Creates a test database and synthetic users, starts Django's live test
+server and drives login, session creation and send_message over HTTP.
+OpenAI and Pinecone are replaced by in-process stand-ins that sleep
+according to the given latency distributions (median,p95 in ms), so the
+numbers measure this application's overhead under concurrency plus the
+modelled upstream latency, without spending API quota.
+"""
+
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.testcases import LiveServerThread
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from chat.loadtest import (
+    LatencyModel, StageTimer, StandInOpenAIClient, StandInPineconeClient, SyntheticUser, run_load
+)
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+
+STAGE_ORDER = [
+    'login', 'open_session', 'queue_wait', 'embedding', 'vector_query', 'completion', 'send_message',
+]
+
+
+class Command(BaseCommand):
+    help = "Load-test the chat path with synthetic users and simulated OpenAI/Pinecone latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help="Synthetic users (max concurrent turns)")
+        parser.add_argument('--rate', type=float, default=2.0, help="Mean messages per second (Poisson arrivals)")
+        parser.add_argument('--duration', type=float, default=60.0, help="Seconds to generate arrivals")
+        parser.add_argument('--embedding-latency', type=LatencyModel.parse, default='80,250',
+                            help="Query embedding latency as median,p95 in ms")
+        parser.add_argument('--query-latency', type=LatencyModel.parse, default='40,150',
+                            help="Vector query latency as median,p95 in ms")
+        parser.add_argument('--completion-latency', type=LatencyModel.parse, default='1500,4000',
+                            help="Chat completion latency as median,p95 in ms")
+        parser.add_argument('--slo', type=float, default=5.0,
+                            help="Response-time target in seconds for send_message")
+        parser.add_argument('--max-error-rate', type=float, default=0.05,
+                            help="Fail the run if more than this share of messages errored or was rejected")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['rate'] <= 0 or options['duration'] <= 0:
+            raise CommandError("--users, --rate and --duration must be positive")
+
+        timer = StageTimer()
+        openai_stand_in = StandInOpenAIClient(
+            timer, options['embedding_latency'], options['completion_latency']
+        )
+        pinecone_stand_in = StandInPineconeClient(timer, options['query_latency'])
+
+        # In-memory SQLite cannot be shared with the server's request threads,
+        # so the test database goes to a temporary file instead
+        db_dir = tempfile.TemporaryDirectory()
+        for connection in connections.all():
+            if connection.vendor == 'sqlite':
+                connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(
+                    db_dir.name, f"loadtest_{connection.alias}.sqlite3"
+                )
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        server = None
+
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'], DEBUG=False), \
+                    mock.patch('chat.views.get_openai_client', return_value=openai_stand_in), \
+                    mock.patch('chat.views.get_pinecone_client', return_value=pinecone_stand_in):
+                server = LiveServerThread('localhost', StaticFilesHandler, port=0)
+                server.daemon = True
+                server.start()
+                server.is_ready.wait()
+                if server.error:
+                    raise CommandError(f"Test server failed to start: {str(server.error)}")
+
+                base_url = f"http://localhost:{server.port}"
+                self.stdout.write(f"Test server at {base_url}")
+
+                users = self._prepare_users(base_url, options['users'], timer)
+                self.stdout.write(
+                    f"Running {options['duration']:.0f}s at {options['rate']:.2f} msg/s "
+                    f"across {len(users)} users"
+                )
+                result = run_load(users, options['rate'], options['duration'], timer)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.join()
+            connections.close_all()
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            db_dir.cleanup()
+
+        self._report(timer, result, options['slo'], options['max_error_rate'])
+
+    def _prepare_users(self, base_url, count, timer):
+        """Create accounts, then log every user in and open a session concurrently"""
+        User = get_user_model()
+        password = 'loadtest-password'
+        users = []
+
+        for i in range(count):
+            username = f"loadtest_{i}"
+            User.objects.create_user(username=username, password=password)
+            users.append(SyntheticUser(base_url, username, password, timer))
+
+        def warm(user):
+            user.log_in()
+            user.open_session()
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            list(executor.map(warm, users))
+
+        return users
+
+    def _report(self, timer, result, slo, max_error_rate):
+        report = timer.report()
+        stages = [stage for stage in STAGE_ORDER if stage in report]
+        stages += [stage for stage in report if stage not in STAGE_ORDER]
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'stage':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        )
+        for stage in stages:
+            row = report[stage]
+            if row['count']:
+                self.stdout.write(
+                    f"{stage:<22}{row['count']:>7}{row['errors']:>8}"
+                    f"{row['p50']:>10.0f}{row['p95']:>10.0f}{row['p99']:>10.0f}{row['max']:>10.0f}"
+                )
+            else:
+                self.stdout.write(f"{stage:<22}{0:>7}{row['errors']:>8}")
+
+        self.stdout.write("")
+        completed = report.get('send_message', {}).get('count', 0)
+        errors = (
+            report.get('send_message', {}).get('errors', 0)
+            + report.get('send_message_rejected', {}).get('errors', 0)
+        )
+        self.stdout.write(
+            f"{result['arrivals']} arrivals, {completed} completed in {result['elapsed']:.1f}s "
+            f"({completed / max(result['elapsed'], 0.001):.2f} msg/s)"
+        )
+
+        within = timer.fraction_under('send_message', slo)
+        if within is not None:
+            style = self.style.SUCCESS if within >= 0.95 else self.style.WARNING
+            self.stdout.write(style(f"{within:.1%} of messages answered within {slo:.1f}s"))
+
+        # A run where turns fail measures error paths, not the chat path
+        answered = completed - report.get('send_message_rejected', {}).get('errors', 0)
+        if answered <= 0:
+            raise CommandError("No message was answered successfully; the latencies above are not meaningful")
+        error_rate = errors / max(result['arrivals'], 1)
+        if error_rate > max_error_rate:
+            raise CommandError(
+                f"{error_rate:.1%} of messages failed or were rejected (limit {max_error_rate:.1%})"
+            )
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        ('documents', '0006_ingestioncheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='documents',
+            field=models.ManyToManyField(blank=True, related_name='chat_sessions', to='documents.document'),
+        ),
+    ]
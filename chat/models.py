@@ -11,6 +11,13 @@ class ChatSession(models.Model):
         related_name='chat_sessions'
     )
     title = models.CharField(max_length=255, default="New Chat")
+    # Optional subset of the user's documents; retrieval is limited to these
+    # when set, and searches all of the user's documents when empty
+    documents = models.ManyToManyField(
+        'documents.Document',
+        blank=True,
+        related_name='chat_sessions'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -19,6 +26,10 @@ class ChatSession(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
+    
+    def pinned_document_ids(self):
+        """Sorted IDs of the documents this session is restricted to"""
+        return sorted(self.documents.values_list('id', flat=True))
 
 
 class Message(models.Model):
@@ -0,0 +1,70 @@
+"""
+Session List Cache for AxonFlow AI
+Per-user cache of the chat session list and its rendered sidebar
+"""
+
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.template.loader import render_to_string
+from .models import ChatSession
+import time
+
+
+def _version(user_id: int) -> int:
+    """
+    Current cache generation for a user's session list
+    
+    Cached entries are keyed by generation, so invalidating is a single
+    write and stale entries simply age out.
+    """
+    key = f"chat:sessions:version:{user_id}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_session_list(user_id: int):
+    """Start a new generation after a session was created, changed or deleted"""
+    cache.set(f"chat:sessions:version:{user_id}", time.time_ns(), None)
+
+
+def session_list(user_id: int) -> List[Dict]:
+    """
+    The user's sessions, most recently updated first
+    
+    Returns:
+        List of dicts with 'id', 'title', 'updated_at' and 'message_count'
+    """
+    key = f"chat:sessions:{user_id}:{_version(user_id)}"
+    sessions = cache.get(key)
+    if sessions is None:
+        sessions = list(
+            ChatSession.objects.filter(user_id=user_id)
+            .annotate(message_count=Count('messages'))
+            .values('id', 'title', 'updated_at', 'message_count')
+        )
+        cache.set(key, sessions, settings.CHAT_SESSION_CACHE_TTL)
+    return sessions
+
+
+def sidebar_html(user_id: int, active_session_id: Optional[int] = None) -> str:
+    """
+    Rendered session sidebar, cached per user and highlighted session
+    
+    Args:
+        user_id: Owner of the sessions
+        active_session_id: Session to highlight
+    """
+    key = f"chat:sidebar:{user_id}:{_version(user_id)}:{active_session_id}"
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('chat/_sidebar.html', {
+            'all_sessions': session_list(user_id),
+            'active_session_id': active_session_id,
+        })
+        cache.set(key, html, settings.CHAT_SESSION_CACHE_TTL)
+    return html
@@ -0,0 +1,27 @@
+"""
+Signal handlers keeping the cached session list current
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import ChatSession, Message
+from .session_cache import invalidate_session_list
+
+
+@receiver(post_save, sender=ChatSession)
+@receiver(post_delete, sender=ChatSession)
+def session_changed(sender, instance, **kwargs):
+    """Created, renamed or deleted sessions change the list"""
+    invalidate_session_list(instance.user_id)
+
+
+@receiver(post_save, sender=Message)
+def message_created(sender, instance, created, **kwargs):
+    """A new message touches its session, moving it to the top of the list"""
+    if not created:
+        return
+    
+    # A queryset update, so the session's own post_save does not fire again
+    ChatSession.objects.filter(id=instance.session_id).update(updated_at=timezone.now())
+    invalidate_session_list(instance.session.user_id)
@@ -6,6 +6,8 @@ urlpatterns = [
     path('new/', views.chat_session, name='new_chat'),
     path('session/<int:session_id>/', views.chat_session, name='chat_session'),
     path('session/<int:session_id>/send/', views.send_message, name='send_message'),
+    path('session/<int:session_id>/prefetch/', views.prefetch_context, name='prefetch_context'),
+    path('session/<int:session_id>/documents/', views.set_session_documents, name='set_session_documents'),
     path('session/<int:session_id>/delete/', views.delete_session, name='delete_session'),
     path('session/<int:session_id>/rename/', views.rename_session, name='rename_session'),
 ]
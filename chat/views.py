@@ -2,17 +2,251 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.core.cache import cache
+from .deadlines import Deadline, StageTimeout, gather, latency_tracker
 from .models import ChatSession, Message
-from documents.openai_client import OpenAIClient
-from documents.pinecone_client import PineconeClient
+from .session_cache import session_list, sidebar_html
+from documents.circuit_breaker import CircuitOpen
+from documents.indexes import active_index
+from documents.models import Document, DocumentSummary
+from documents.openai_client import get_openai_client
+from documents.pinecone_client import PineconeClient, get_pinecone_client
+from documents.retrieval import query_variants, reciprocal_rank_fusion, rerank_mmr
+from documents.summaries import is_bare_overview_query, is_overview_query, overview_documents, summary_context
+from usage.ledger import attribute_usage, is_over_quota
+import hashlib
 import json
+import numpy as np
+
+
+def _prefetch_cache_key(session_id, message, document_ids, history, index_name):
+    """
+    Cache key for speculatively retrieved context of a draft message
+    
+    Covers everything retrieval depends on: the history (query variants are
+    rewritten from it) and the index, which may be swapped in between.
+    """
+    normalized = ' '.join(message.split()).lower()
+    scope = ','.join(str(document_id) for document_id in document_ids)
+    context = json.dumps(history, sort_keys=True)
+    digest = hashlib.sha1(f"{index_name}|{scope}|{context}|{normalized}".encode('utf-8')).hexdigest()
+    return f"chat:prefetch:{session_id}:{digest}"
+
+
+def _conversation_history(session, limit=5):
+    """Last `limit` messages of a session as {'role', 'content'}, oldest first"""
+    return [
+        {
+            'role': 'user' if msg.role == Message.Role.USER else 'assistant',
+            'content': msg.content
+        }
+        for msg in session.messages.order_by('-created_at')[:limit][::-1]
+    ]
+
+
+def _retrieve_context(user_id, message, openai_client, pinecone_client, document_ids=None, deadline=None,
+                      history=None):
+    """
+    Embed a message and return the re-ranked matches from the user's documents
+    
+    When document_ids is non-empty the search is restricted to those
+    documents, which shrinks the candidate set for sessions pinned to a few
+    files. With a deadline, embedding and query are each bounded by their
+    stage budget and hedged when slow; StageTimeout and CircuitOpen
+    propagate.
+    
+    With RAG_MULTI_QUERY, the message is expanded into query variants
+    (history-aware rewrite, sub-questions) that are embedded and searched
+    concurrently, with the same coalescing and hedging as a single query;
+    their results are merged with reciprocal rank fusion before MMR. A
+    message without variants takes the single-query path.
+    """
+    def run(stage, call):
+        if deadline is None:
+            return call(True)
+        return deadline.run(stage, lambda: call(True), hedge=lambda: call(False))
+    
+    filter_dict = {"document_id": {"$in": list(document_ids)}} if document_ids else None
+    namespace = PineconeClient.namespace_for_user(user_id)
+    
+    # Documents whose vectors are still in the shared default namespace
+    # (ingested before per-user namespaces, not yet moved by
+    # migrate_vector_namespaces) are searched there, by ID
+    legacy = Document.objects.filter(
+        user_id=user_id,
+        processing_status=Document.Status.COMPLETED,
+        vector_namespace=''
+    )
+    if document_ids:
+        legacy = legacy.filter(id__in=document_ids)
+    legacy_ids = list(legacy.values_list('id', flat=True))
+    
+    def search(query_embedding, coalesce=True):
+        # Search Pinecone for relevant chunks (only the user's own namespace),
+        # over-fetching so MMR can drop near-duplicate overlapping chunks
+        matches = pinecone_client.query_vectors(
+            query_vector=query_embedding,
+            top_k=settings.RAG_FETCH_K,
+            filter_dict=filter_dict,
+            namespace=namespace,
+            include_values=True,
+            coalesce=coalesce
+        )
+        if legacy_ids:
+            matches = matches + pinecone_client.query_vectors(
+                query_vector=query_embedding,
+                top_k=settings.RAG_FETCH_K,
+                filter_dict={"document_id": {"$in": legacy_ids}},
+                namespace='',
+                include_values=True,
+                coalesce=coalesce
+            )
+            # Same query embedding, so the scores are comparable
+            matches = sorted(matches, key=lambda match: match['score'], reverse=True)[:settings.RAG_FETCH_K]
+        return matches
+    
+    variants = [message]
+    if settings.RAG_MULTI_QUERY:
+        variants = query_variants(message, history, limit=settings.RAG_MAX_QUERY_VARIANTS)
+    
+    if len(variants) == 1:
+        # Create embedding for user query
+        query_embedding = run('embedding', lambda coalesce: openai_client.create_embedding(message, coalesce=coalesce))
+        candidates = run('vector_query', lambda coalesce: search(query_embedding, coalesce))
+    else:
+        # Each variant embedded on its own so coalescing and hedging apply,
+        # then one query per variant, all in parallel
+        embed = [
+            lambda variant=variant, coalesce=True: openai_client.create_embedding(variant, coalesce=coalesce)
+            for variant in variants
+        ]
+        if deadline is None:
+            embeddings = gather('embedding', embed)
+        else:
+            embeddings = deadline.run_all(
+                'embedding', embed, hedges=[lambda call=call: call(coalesce=False) for call in embed]
+            )
+        embeddings = [embedding for embedding in embeddings if embedding is not None]
+        
+        searches = [
+            lambda embedding=embedding, coalesce=True: search(embedding, coalesce)
+            for embedding in embeddings
+        ]
+        if deadline is None:
+            result_lists = gather('vector_query', searches)
+        else:
+            result_lists = deadline.run_all(
+                'vector_query', searches, hedges=[lambda call=call: call(coalesce=False) for call in searches]
+            )
+        candidates = reciprocal_rank_fusion(
+            [results for results in result_lists if results is not None],
+            k=settings.RAG_RRF_K,
+            limit=settings.RAG_FETCH_K
+        )
+        
+        # Diversify against the variants' common direction
+        query_embedding = np.mean(embeddings, axis=0)
+        query_embedding = query_embedding / (np.linalg.norm(query_embedding) or 1.0)
+    
+    search_results = rerank_mmr(
+        query_embedding,
+        candidates,
+        k=settings.RAG_CONTEXT_K,
+        lambda_mult=settings.RAG_MMR_LAMBDA
+    )
+    
+    # Embeddings are only needed for re-ranking
+    return [
+        {key: value for key, value in result.items() if key != 'values'}
+        for result in search_results
+    ]
+
+
+def _answer_from_summaries(user_id, message, document_ids, openai_client, conversation_history, deadline):
+    """
+    Answer an overview question from stored summary trees
+    
+    A bare request for the summary of one document is answered with its
+    stored summary, without any API call; other overview questions take one
+    short completion over the summaries instead of retrieved chunks.
+    
+    Returns:
+        (ai_response, sources, degraded), or None when the question should
+        go through regular retrieval (target unclear or not summarized yet)
+    """
+    documents = overview_documents(user_id, message, document_ids)
+    if not documents:
+        return None
+    
+    context = summary_context(documents)
+    overviews = [node for node in context if node['level'] == DocumentSummary.Level.DOCUMENT]
+    sources = [
+        {
+            'document_title': node['document'].title,
+            'chunk_index': 0,
+            'page_start': node['page_start'],
+            'page_end': node['page_end'],
+            'score': 1.0
+        }
+        for node in overviews
+    ]
+    
+    if len(documents) == 1 and is_bare_overview_query(message, [documents[0].title]):
+        return f'Summary of "{documents[0].title}":\n\n{overviews[0]["text"]}', sources, False
+    
+    context_chunks = []
+    for node in context:
+        if node['level'] == DocumentSummary.Level.DOCUMENT:
+            label = f"{node['document'].title}, whole document"
+        else:
+            label = f"{node['document'].title}, pages {node['page_start']}-{node['page_end']}"
+        context_chunks.append(f"({label}) {node['text']}")
+    
+    try:
+        ai_response = deadline.run('completion', lambda: openai_client.generate_rag_response(
+            query=message,
+            context_chunks=context_chunks,
+            conversation_history=conversation_history,
+            max_tokens=500
+        ))
+    except (StageTimeout, CircuitOpen):
+        # The stored summaries answer an overview question well enough
+        ai_response = "\n\n".join(f"{node['document'].title}: {node['text']}" for node in overviews)
+        return ai_response, sources, True
+    return ai_response, sources, False
+
+
+def _reply(session, user_msg, ai_response, sources, degraded):
+    """Save the assistant message and return the turn's JSON response"""
+    ai_msg = Message.objects.create(
+        session=session,
+        role=Message.Role.ASSISTANT,
+        content=ai_response,
+        sources=sources
+    )
+    
+    return JsonResponse({
+        'success': True,
+        'degraded': degraded,
+        'user_message': {
+            'id': user_msg.id,
+            'content': user_msg.content,
+            'created_at': user_msg.created_at.isoformat()
+        },
+        'ai_message': {
+            'id': ai_msg.id,
+            'content': ai_msg.content,
+            'sources': ai_msg.sources,
+            'created_at': ai_msg.created_at.isoformat()
+        }
+    })
 
 
 @login_required
 def chat_home(request):
     """Chat home page - list all sessions"""
-    sessions = ChatSession.objects.filter(user=request.user)
-    return render(request, 'chat/home.html', {'sessions': sessions})
+    return render(request, 'chat/home.html', {'sessions': session_list(request.user.id)})
 
 
 @login_required
@@ -33,13 +267,17 @@ def chat_session(request, session_id=None):
     # Get all messages in session
     messages = session.messages.all()
     
-    # Get all sessions for sidebar
-    all_sessions = ChatSession.objects.filter(user=request.user)
-    
     context = {
         'session': session,
         'messages': messages,
-        'all_sessions': all_sessions,
+        # Cached per user, invalidated by chat.signals
+        'sidebar_html': sidebar_html(request.user.id, session.id),
+        'prefetch_min_chars': settings.CHAT_PREFETCH_MIN_CHARS,
+        'available_documents': Document.objects.filter(
+            user=request.user,
+            processing_status=Document.Status.COMPLETED
+        ).order_by('title'),
+        'pinned_document_ids': session.pinned_document_ids(),
     }
     
     return render(request, 'chat/session.html', context)
@@ -47,9 +285,13 @@ def chat_session(request, session_id=None):
 
 @login_required
 @require_POST
+@attribute_usage
 def send_message(request, session_id):
     """Handle sending a message and getting AI response"""
     
+    # The whole turn, including database work, shares one time budget
+    deadline = Deadline(settings.CHAT_TURN_BUDGET)
+    
     try:
         session = get_object_or_404(ChatSession, id=session_id, user=request.user)
         
@@ -60,6 +302,9 @@ def send_message(request, session_id):
         if not user_message:
             return JsonResponse({'error': 'Message cannot be empty'}, status=400)
         
+        if is_over_quota(request.user.id):
+            return JsonResponse({'error': 'Daily usage limit reached. Please try again tomorrow.'}, status=429)
+        
         # Save user message
         user_msg = Message.objects.create(
             session=session,
@@ -74,19 +319,39 @@ def send_message(request, session_id):
             session.title = ' '.join(title_words) + ('...' if len(title_words) == 5 else '')
             session.save()
         
-        # Initialize clients
-        openai_client = OpenAIClient()
-        pinecone_client = PineconeClient()
+        # Initialize clients; queries are embedded like the index being read
+        index = active_index()
+        openai_client = get_openai_client(embedding=index.embedding)
         
-        # Create embedding for user query
-        query_embedding = openai_client.create_embedding(user_message)
+        # Get conversation history (last 5 messages), excluding the current one
+        conversation_history = _conversation_history(session, limit=6)[:-1]
         
-        # Search Pinecone for relevant chunks (filter by user_id)
-        search_results = pinecone_client.query_vectors(
-            query_vector=query_embedding,
-            top_k=5,
-            filter_dict={"user_id": {"$eq": request.user.id}}
+        # Overview questions are answered from precomputed document summaries
+        document_ids = session.pinned_document_ids()
+        if settings.DOCUMENT_SUMMARIES and is_overview_query(user_message):
+            overview = _answer_from_summaries(
+                request.user.id, user_message, document_ids, openai_client, conversation_history, deadline
+            )
+            if overview is not None:
+                return _reply(session, user_msg, *overview)
+        
+        # Use context prefetched while the user was typing, if any
+        search_results = cache.get(
+            _prefetch_cache_key(session.id, user_message, document_ids, conversation_history, index.name)
         )
+        retrieval_failed = None
+        if search_results is None:
+            try:
+                search_results = _retrieve_context(
+                    request.user.id, user_message, openai_client, get_pinecone_client(index), document_ids,
+                    deadline=deadline, history=conversation_history
+                )
+            except StageTimeout:
+                search_results = []
+                retrieval_failed = "I couldn't search your documents quickly enough just now."
+            except CircuitOpen:
+                search_results = []
+                retrieval_failed = "Document search is temporarily unavailable."
         
         # Extract context chunks and sources
         context_chunks = []
@@ -100,60 +365,118 @@ def send_message(request, session_id):
             source = {
                 'document_title': metadata.get('document_title', 'Unknown'),
                 'chunk_index': metadata.get('chunk_index', 0),
+                'page_start': metadata.get('page_start'),
+                'page_end': metadata.get('page_end'),
                 'score': result['score']
             }
             sources.append(source)
         
-        # Get conversation history (last 5 messages)
-        history_messages = session.messages.order_by('-created_at')[:6][::-1]
-        conversation_history = []
-        
-        for msg in history_messages[:-1]:  # Exclude the current user message
-            conversation_history.append({
-                'role': 'user' if msg.role == Message.Role.USER else 'assistant',
-                'content': msg.content
-            })
-        
         # Generate AI response
-        if context_chunks:
-            ai_response = openai_client.generate_rag_response(
-                query=user_message,
-                context_chunks=context_chunks,
-                conversation_history=conversation_history
-            )
+        degraded = retrieval_failed is not None
+        if retrieval_failed:
+            ai_response = f"{retrieval_failed} Please try again in a moment."
+        elif context_chunks:
+            # Short on time: a smaller prompt and answer finish sooner
+            max_tokens = 1000
+            completion_p95 = latency_tracker.percentile('completion', 95)
+            if completion_p95 is not None and deadline.remaining() < completion_p95 and len(context_chunks) > 1:
+                keep = max(1, len(context_chunks) // 2)
+                context_chunks = context_chunks[:keep]
+                sources = sources[:keep]
+                max_tokens = 500
+                degraded = True
+            
+            try:
+                ai_response = deadline.run('completion', lambda: openai_client.generate_rag_response(
+                    query=user_message,
+                    context_chunks=context_chunks,
+                    conversation_history=conversation_history,
+                    max_tokens=max_tokens
+                ))
+            except (StageTimeout, CircuitOpen) as e:
+                cited = ', '.join(dict.fromkeys(source['document_title'] for source in sources))
+                reason = (
+                    "I couldn't finish an answer in time."
+                    if isinstance(e, StageTimeout)
+                    else "Answering is temporarily unavailable."
+                )
+                ai_response = f"{reason} The most relevant passages are in: {cited}. Please try asking again."
+                degraded = True
         else:
             # No relevant documents found
             ai_response = "I couldn't find any relevant information in your uploaded documents to answer this question. Please make sure you have uploaded documents related to your query."
             sources = []
         
-        # Save AI message
-        ai_msg = Message.objects.create(
-            session=session,
-            role=Message.Role.ASSISTANT,
-            content=ai_response,
-            sources=sources
-        )
+        # Save AI message and return response
+        return _reply(session, user_msg, ai_response, sources, degraded)
         
-        # Return response
-        return JsonResponse({
-            'success': True,
-            'user_message': {
-                'id': user_msg.id,
-                'content': user_msg.content,
-                'created_at': user_msg.created_at.isoformat()
-            },
-            'ai_message': {
-                'id': ai_msg.id,
-                'content': ai_msg.content,
-                'sources': ai_msg.sources,
-                'created_at': ai_msg.created_at.isoformat()
-            }
-        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_POST
+@attribute_usage
+def prefetch_context(request, session_id):
+    """
+    Speculatively retrieve context for a draft message
+    
+    Called (debounced) while the user types. Results are cached briefly per
+    session so send_message can skip embedding and search when the final
+    message matches the draft.
+    """
+    session = get_object_or_404(ChatSession, id=session_id, user=request.user)
+    
+    try:
+        data = json.loads(request.body)
+        draft = data.get('message', '').strip()
+        
+        if len(draft) < settings.CHAT_PREFETCH_MIN_CHARS:
+            return JsonResponse({'success': True, 'prefetched': False})
+        
+        document_ids = session.pinned_document_ids()
+        history = _conversation_history(session)
+        index = active_index()
+        key = _prefetch_cache_key(session.id, draft, document_ids, history, index.name)
+        if cache.get(key) is None:
+            search_results = _retrieve_context(
+                request.user.id,
+                draft,
+                get_openai_client(embedding=index.embedding),
+                get_pinecone_client(index),
+                document_ids,
+                history=history
+            )
+            cache.set(key, search_results, settings.CHAT_PREFETCH_TTL)
         
+        return JsonResponse({'success': True, 'prefetched': True})
+        
+    except CircuitOpen:
+        # Speculative work is simply skipped during an outage
+        return JsonResponse({'success': True, 'prefetched': False})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required
+@require_POST
+def set_session_documents(request, session_id):
+    """Restrict a chat session's retrieval to a subset of the user's documents"""
+    session = get_object_or_404(ChatSession, id=session_id, user=request.user)
+    
+    data = json.loads(request.body)
+    requested_ids = data.get('document_ids', [])
+    if not isinstance(requested_ids, list) or not all(isinstance(i, int) for i in requested_ids):
+        return JsonResponse({'error': 'document_ids must be a list of IDs'}, status=400)
+    
+    documents = Document.objects.filter(user=request.user, id__in=requested_ids)
+    if documents.count() != len(set(requested_ids)):
+        return JsonResponse({'error': 'Unknown document'}, status=400)
+    
+    session.documents.set(documents)
+    return JsonResponse({'success': True, 'document_ids': session.pinned_document_ids()})
+
+
 @login_required
 @require_POST
 def delete_session(request, session_id):
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class DocumentsConfig(AppConfig):
     name = 'documents'
+
+    def ready(self):
+        # Web workers can warm up in the background as soon as the app loads;
+        # enabled per deployment so management commands stay fast
+        from .warmup import should_warm_on_startup, warm_up_in_background
+
+        if should_warm_on_startup():
+            warm_up_in_background()
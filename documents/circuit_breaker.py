@@ -0,0 +1,199 @@
+"""
+Circuit Breakers for AxonFlow AI
+Stop calling an upstream service that is failing, and probe before resuming
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+from django.conf import settings
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Upstream services ingestion depends on, each with its own breaker
+DEPENDENCIES = ('openai', 'pinecone')
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Per-dependency breaker over a rolling window of recent calls
+
+    CLOSED: calls flow; each outcome is recorded, and calls slower than
+    `slow_call_seconds` count as failures. Once at least `min_calls` are in
+    the window and the failure rate reaches `failure_rate`, the breaker
+    OPENs. OPEN: calls are refused (or wait, when blocking) for `cooldown`
+    seconds. HALF_OPEN: a single probe call is let through; its success
+    closes the breaker, its failure opens it for another cooldown.
+    """
+
+    def __init__(self, name: str, failure_rate: float, min_calls: int, window: int,
+                 cooldown: float, slow_call_seconds: float):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.slow_call_seconds = slow_call_seconds
+
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._opened_count = 0
+        self._condition = threading.Condition()
+
+    @property
+    def state(self) -> str:
+        with self._condition:
+            return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until a probe may be attempted (0 unless OPEN)"""
+        with self._condition:
+            if self._state != OPEN:
+                return 0.0
+            return max(self._opened_at + self.cooldown - time.monotonic(), 0.0)
+
+    def _try_acquire(self) -> float:
+        """Permit a call if possible; otherwise return seconds to wait"""
+        if self._state == CLOSED:
+            return 0.0
+        if self._state == OPEN:
+            wait_for = self._opened_at + self.cooldown - time.monotonic()
+            if wait_for > 0:
+                return wait_for
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"Circuit {self.name} half-open, probing")
+        if not self._probe_in_flight:
+            self._probe_in_flight = True
+            return 0.0
+        return 1.0
+
+    def acquire(self, block: bool = False, timeout: Optional[float] = None):
+        """
+        Get permission for one call
+
+        Args:
+            block: Wait for the circuit to allow the call instead of raising
+                (ingestion pauses here during an outage)
+            timeout: Maximum seconds to wait when blocking
+
+        Raises:
+            CircuitOpen: If the call is not permitted (in time)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            while True:
+                wait_for = self._try_acquire()
+                if not wait_for:
+                    return
+                if deadline is not None:
+                    wait_for = min(wait_for, deadline - time.monotonic())
+                if not block or wait_for <= 0:
+                    raise CircuitOpen(self.name, max(self._opened_at + self.cooldown - time.monotonic(), 0.0))
+                self._condition.wait(wait_for)
+
+    def record_success(self, latency: float):
+        if latency > self.slow_call_seconds:
+            self.record_failure()
+            return
+
+        with self._condition:
+            if self._state == HALF_OPEN:
+                logger.info(f"Circuit {self.name} closed after successful probe")
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+                self._condition.notify_all()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._condition:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (
+                self._state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+
+    def _open(self):
+        logger.warning(f"Circuit {self.name} opened; pausing calls for {self.cooldown:.0f}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._opened_count += 1
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        self._condition.notify_all()
+
+    def snapshot(self) -> Dict:
+        """Monitoring view of the breaker"""
+        with self._condition:
+            failures = self._outcomes.count(False)
+            return {
+                'state': self._state,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': failures,
+                'times_opened': self._opened_count,
+                'retry_in': round(max(self._opened_at + self.cooldown - time.monotonic(), 0.0), 1)
+                if self._state == OPEN else 0.0,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a dependency ('openai', 'pinecone')"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(
+                    name,
+                    failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+                    min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+                    window=settings.CIRCUIT_BREAKER_WINDOW,
+                    cooldown=settings.CIRCUIT_BREAKER_COOLDOWN,
+                    slow_call_seconds=settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS.get(name, 30.0),
+                )
+    return breaker
+
+
+def open_circuits() -> List[CircuitBreaker]:
+    """Breakers that are currently not CLOSED"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker for breaker in breakers if breaker.state != CLOSED]
+
+
+def circuit_states() -> Dict[str, Dict]:
+    """Snapshot of every dependency's breaker, for monitoring"""
+    for name in DEPENDENCIES:
+        get_breaker(name)
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
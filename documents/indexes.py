@@ -0,0 +1,160 @@
+"""
+Vector Index Registry for AxonFlow AI
+Read pointer, dual-write targets and blue/green cutover
+"""
+
+from typing import Dict, List
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Document, IngestionCheckpoint, VectorIndex
+from .openai_client import embedding_config
+from .pinecone_client import PineconeClient, get_pinecone_client
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_active = {'index': None, 'fetched_at': 0.0}
+_active_lock = threading.Lock()
+
+
+def active_index(refresh: bool = False) -> VectorIndex:
+    """
+    The VectorIndex all reads go to
+
+    Cached per process for VECTOR_INDEX_POINTER_TTL seconds. The first call
+    on a fresh database registers PINECONE_INDEX_NAME with the configured
+    embedding settings as the active index.
+
+    Args:
+        refresh: Bypass the cache (ingestion does, to pick up a cutover at once)
+    """
+    with _active_lock:
+        index = _active['index']
+        if (
+            not refresh
+            and index is not None
+            and time.monotonic() - _active['fetched_at'] < settings.VECTOR_INDEX_POINTER_TTL
+        ):
+            return index
+
+    index = VectorIndex.objects.filter(status=VectorIndex.Status.ACTIVE).first()
+    if index is None:
+        model, dimension = embedding_config()
+        index, _ = VectorIndex.objects.get_or_create(
+            name=settings.PINECONE_INDEX_NAME,
+            defaults={
+                'status': VectorIndex.Status.ACTIVE,
+                'embedding_model': model,
+                'embedding_dimension': dimension,
+                'activated_at': timezone.now(),
+            }
+        )
+
+    with _active_lock:
+        _active['index'] = index
+        _active['fetched_at'] = time.monotonic()
+    return index
+
+
+def building_indexes() -> List[VectorIndex]:
+    """Indexes being rebuilt, which new ingestions are dual-written to"""
+    return list(VectorIndex.objects.filter(status=VectorIndex.Status.BUILDING).order_by('id'))
+
+
+def check_parity(index: VectorIndex) -> Dict:
+    """
+    Decide whether a BUILDING index is complete enough to serve reads
+
+    Every completed document must have been written to the index, no
+    document may be mid-ingestion, and the vectors Pinecone reports per
+    namespace must equal those recorded for the index.
+
+    Args:
+        index: The BUILDING index
+
+    Returns:
+        {'ok': bool, 'missing_documents': [ids], 'in_flight': int,
+         'mismatched_namespaces': {namespace: {'expected', 'actual'}},
+         'active_vectors': int, 'index_vectors': int}
+    """
+    completed = Document.objects.filter(processing_status=Document.Status.COMPLETED)
+    missing = list(completed.exclude(index_entries__index=index).values_list('id', flat=True))
+    in_flight = Document.objects.filter(processing_status=Document.Status.PROCESSING).count()
+
+    expected = {}
+    for row in index.entries.values('document__user_id').annotate(vectors=Sum('vector_count')):
+        namespace = PineconeClient.namespace_for_user(row['document__user_id'])
+        expected[namespace] = row['vectors']
+
+    actual = get_pinecone_client(index).namespace_counts()
+    mismatched = {
+        namespace: {'expected': expected.get(namespace, 0), 'actual': actual.get(namespace, 0)}
+        for namespace in set(expected) | set(actual)
+        if expected.get(namespace, 0) != actual.get(namespace, 0)
+    }
+
+    return {
+        'ok': not missing and not in_flight and not mismatched,
+        'missing_documents': missing,
+        'in_flight': in_flight,
+        'mismatched_namespaces': mismatched,
+        'active_vectors': completed.aggregate(total=Sum('vector_count'))['total'] or 0,
+        'index_vectors': sum(expected.values()),
+    }
+
+
+def activate_index(index: VectorIndex) -> VectorIndex:
+    """
+    Switch reads to a BUILDING index in one transaction
+
+    The previous active index is retired (its vectors stay until dropped),
+    and every document's vector manifest is replaced by the one recorded for
+    the new index. Ingestion checkpoints forget their confirmed upserts,
+    since those went to the old index.
+
+    Args:
+        index: The BUILDING index to activate
+
+    Returns:
+        The activated index
+    """
+    with transaction.atomic():
+        index = VectorIndex.objects.select_for_update().get(pk=index.pk)
+        if index.status != VectorIndex.Status.BUILDING:
+            raise ValueError(f"Index {index.name} is {index.status}, not BUILDING")
+
+        VectorIndex.objects.select_for_update().filter(
+            status=VectorIndex.Status.ACTIVE
+        ).update(status=VectorIndex.Status.RETIRED)
+
+        entries = index.entries.select_related('document')
+        for entry in entries:
+            Document.objects.filter(id=entry.document_id).update(
+                vector_count=entry.vector_count,
+                vector_id_scheme=Document.VECTOR_ID_SCHEME,
+                vector_namespace=PineconeClient.namespace_for_user(entry.document.user_id),
+                embedding_model=index.embedding_model,
+                embedding_dimension=index.embedding_dimension,
+            )
+        Document.objects.exclude(index_entries__index=index).update(
+            vector_count=0,
+            embedding_model='',
+            embedding_dimension=0,
+        )
+        IngestionCheckpoint.objects.update(upserted_ranges=[])
+        entries.delete()
+
+        index.status = VectorIndex.Status.ACTIVE
+        index.activated_at = timezone.now()
+        index.save(update_fields=['status', 'activated_at'])
+
+    with _active_lock:
+        _active['index'] = index
+        _active['fetched_at'] = time.monotonic()
+
+    logger.info(f"Activated vector index {index.name}")
+    return index
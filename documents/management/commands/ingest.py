@@ -0,0 +1,157 @@
+"""
+Bulk-ingest PDFs from the filesystem
+
+Usage:
+    python manage.py ingest <dir-or-glob> [...] --user USERNAME [--workers 8] [--processes]
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from documents.circuit_breaker import open_circuits
+from documents.models import Document
+from documents.tasks import process_document
+from documents.utils import file_sha256
+import glob
+import os
+import time
+
+
+def _init_worker():
+    """Give each worker process its own Django setup and DB connections"""
+    import django
+
+    django.setup()
+    connections.close_all()
+
+
+def _process_in_worker(document_id):
+    try:
+        while True:
+            stats = process_document(document_id, resume_when_paused=False)
+            if stats is not None:
+                return stats
+
+            # Paused by an open circuit: wait out the cooldown here and resume
+            paused = Document.objects.filter(
+                id=document_id, processing_status=Document.Status.PENDING
+            ).exists()
+            if not paused:
+                return None
+            time.sleep(max([breaker.retry_in() for breaker in open_circuits()] + [1.0]))
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Create Documents for the PDFs in a directory or glob and process them in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Directories (searched recursively) or glob patterns")
+        parser.add_argument('--user', required=True, help="Username that will own the documents")
+        parser.add_argument('--workers', type=int, default=4, help="Documents processed concurrently")
+        parser.add_argument('--processes', action='store_true',
+                            help="Use a process pool instead of threads (for CPU-bound PDF extraction)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        pdf_paths = self._collect(options['paths'])
+        if not pdf_paths:
+            raise CommandError("No PDF files found")
+
+        document_ids = self._create_documents(user, pdf_paths)
+        if not document_ids:
+            self.stdout.write("Nothing new to ingest")
+            return
+
+        self._process(document_ids, options['workers'], options['processes'])
+
+    def _collect(self, patterns):
+        paths = []
+        for pattern in patterns:
+            if os.path.isdir(pattern):
+                paths.extend(Path(pattern).rglob('*.pdf'))
+            else:
+                paths.extend(Path(match) for match in glob.glob(pattern, recursive=True))
+        return sorted({path.resolve() for path in paths if path.suffix.lower() == '.pdf' and path.is_file()})
+
+    def _create_documents(self, user, pdf_paths):
+        """Create a Document per new file, skipping content already ingested for this user"""
+        known_hashes = set(
+            Document.objects.filter(user=user)
+            .exclude(processing_status=Document.Status.FAILED)
+            .exclude(content_hash='')
+            .values_list('content_hash', flat=True)
+        )
+
+        document_ids = []
+        skipped = 0
+
+        for path in pdf_paths:
+            with open(path, 'rb') as fh:
+                content_hash = file_sha256(fh)
+                if content_hash in known_hashes:
+                    skipped += 1
+                    continue
+                known_hashes.add(content_hash)
+
+                fh.seek(0)
+                document = Document(title=path.stem[:255], user=user, content_hash=content_hash)
+                document.file.save(path.name, File(fh), save=False)
+                document.save()
+                document_ids.append(document.id)
+
+        self.stdout.write(f"Queued {len(document_ids)} documents, skipped {skipped} already ingested")
+        return document_ids
+
+    def _process(self, document_ids, workers, use_processes):
+        if use_processes:
+            # Forked children must not share the parent's DB connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+        totals = {'pages': 0, 'chunks': 0, 'embedding_tokens': 0}
+        completed = failed = 0
+        started = time.monotonic()
+
+        with executor:
+            futures = [executor.submit(_process_in_worker, document_id) for document_id in document_ids]
+
+            for future in as_completed(futures):
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    self.stderr.write(f"Worker error: {str(e)}")
+                    stats = None
+
+                if stats is None:
+                    failed += 1
+                else:
+                    completed += 1
+                    for key in totals:
+                        totals[key] += stats[key]
+
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f"[{completed + failed}/{len(document_ids)}] "
+                    f"{totals['pages'] / elapsed:.1f} pages/s, "
+                    f"{totals['chunks'] / elapsed:.1f} chunks/s, "
+                    f"{totals['embedding_tokens'] / elapsed:.0f} embedding tokens/s"
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s: {completed} completed, {failed} failed, "
+            f"{totals['pages']} pages, {totals['chunks']} chunks, "
+            f"~{totals['embedding_tokens']} embedding tokens"
+        ))
@@ -0,0 +1,72 @@
+"""
+Move vectors from the shared default namespace into per-user namespaces
+
+Usage:
+    python manage.py migrate_vector_namespaces [--user ID] [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from documents.models import Document
+from documents.pinecone_client import PineconeClient, get_pinecone_client
+
+
+class Command(BaseCommand):
+    help = "Move existing document vectors from the shared namespace into per-user namespaces"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only migrate documents of this user ID")
+        parser.add_argument('--batch-size', type=int, default=100, help="Vectors copied per request")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would move without writing")
+
+    def handle(self, *args, **options):
+        pinecone_client = get_pinecone_client()
+        batch_size = options['batch_size']
+
+        documents = Document.objects.filter(vector_namespace='').order_by('id')
+        if options['user']:
+            documents = documents.filter(user_id=options['user'])
+
+        moved_documents = 0
+        moved_vectors = 0
+
+        for document in documents.iterator():
+            source = document.vector_namespace
+            target = PineconeClient.namespace_for_user(document.user_id)
+
+            # Manifest IDs when recorded, otherwise discover them by prefix
+            ids = document.vector_ids() or pinecone_client.list_ids(
+                prefix=document.vector_id('', scheme=Document.VECTOR_ID_SCHEME),
+                namespace=source
+            )
+            if not ids:
+                continue
+
+            self.stdout.write(f"Document {document.id}: {len(ids)} vectors -> {target}")
+            if options['dry_run']:
+                continue
+
+            for i in range(0, len(ids), batch_size):
+                batch = pinecone_client.fetch_vectors(ids[i:i + batch_size], namespace=source)
+                pinecone_client.upsert_vectors(list(batch.values()), namespace=target)
+
+            # Only drop the source copy once every vector is readable in the target
+            copied = pinecone_client.fetch_existing_ids(ids, namespace=target)
+            if len(copied) != len(ids):
+                raise CommandError(
+                    f"Document {document.id}: only {len(copied)} of {len(ids)} vectors "
+                    f"present in {target}; source left untouched"
+                )
+            pinecone_client.delete_by_ids(ids, namespace=source)
+
+            document.vector_namespace = target
+            if not document.vector_id_scheme:
+                document.vector_count = len(ids)
+                document.vector_id_scheme = Document.VECTOR_ID_SCHEME
+            document.save(update_fields=['vector_namespace', 'vector_count', 'vector_id_scheme'])
+
+            moved_documents += 1
+            moved_vectors += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved_vectors} vectors across {moved_documents} documents"
+        ))
@@ -0,0 +1,174 @@
+"""
+Blue/green rebuild of the vector index
+
+Usage:
+    python manage.py rebuild_index start NAME [--embedding-model M] [--dimension D]
+        [--chunk-size N] [--chunk-overlap N]
+    python manage.py rebuild_index build [--workers 4]
+    python manage.py rebuild_index status
+    python manage.py rebuild_index cutover [--force]
+    python manage.py rebuild_index drop NAME
+
+`start` registers a new BUILDING index; from then on every ingestion is
+written to it as well as to the active index. `build` backfills the
+documents that were completed before (safe to re-run; it only does what
+is missing). `cutover` checks parity and switches reads in one
+transaction. The old index is kept until `drop`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from documents.indexes import active_index, activate_index, building_indexes, check_parity
+from documents.models import Document, VectorIndex
+from documents.openai_client import validate_embedding
+from documents.pinecone_client import get_pinecone_client
+from documents.tasks import backfill_document
+import re
+import time
+
+
+class Command(BaseCommand):
+    help = "Rebuild the vector index next to the active one and switch reads without downtime"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        start = subparsers.add_parser('start', help="Register and create a new BUILDING index")
+        start.add_argument('name', help="Pinecone index name (lowercase letters, digits, hyphens)")
+        start.add_argument('--embedding-model', help="Defaults to the active index's model")
+        start.add_argument('--dimension', type=int, default=0, help="0 = model's native dimension")
+        start.add_argument('--chunk-size', type=int, help="Defaults to the active index's chunk size")
+        start.add_argument('--chunk-overlap', type=int, help="Defaults to the active index's overlap")
+
+        build = subparsers.add_parser('build', help="Backfill completed documents into the BUILDING index")
+        build.add_argument('--workers', type=int, default=4, help="Documents backfilled concurrently")
+
+        subparsers.add_parser('status', help="Report vector-count parity of the BUILDING index")
+
+        cutover = subparsers.add_parser('cutover', help="Switch reads to the BUILDING index")
+        cutover.add_argument('--force', action='store_true', help="Switch even if parity checks fail")
+
+        drop = subparsers.add_parser('drop', help="Delete a BUILDING or RETIRED index")
+        drop.add_argument('name')
+
+    def handle(self, *args, **options):
+        getattr(self, f"_{options['action']}")(options)
+
+    def _building(self):
+        indexes = building_indexes()
+        if not indexes:
+            raise CommandError("No index is being rebuilt; run `rebuild_index start` first")
+        return indexes[0]
+
+    def _start(self, options):
+        if building_indexes():
+            raise CommandError("A rebuild is already in progress")
+        if not re.fullmatch(r'[a-z0-9-]{1,45}', options['name']):
+            raise CommandError("Index names may only contain lowercase letters, digits and hyphens")
+        if VectorIndex.objects.filter(name=options['name']).exists():
+            raise CommandError(f"Index {options['name']} already exists")
+
+        current = active_index(refresh=True)
+        try:
+            model, dimension = validate_embedding(
+                options['embedding_model'] or current.embedding_model,
+                options['dimension'] or (0 if options['embedding_model'] else current.embedding_dimension)
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        index = VectorIndex(
+            name=options['name'],
+            embedding_model=model,
+            embedding_dimension=dimension,
+            chunk_size=options['chunk_size'] or current.chunk_size,
+            chunk_overlap=options['chunk_overlap'] if options['chunk_overlap'] is not None else current.chunk_overlap,
+        )
+        get_pinecone_client(index).create_index_if_not_exists()
+        index.save()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Building {index.name} ({model}, {dimension}d, chunks {index.chunk_size}/{index.chunk_overlap}); "
+            f"new ingestions are dual-written from now on"
+        ))
+
+    def _build(self, options):
+        index = self._building()
+        source = active_index(refresh=True)
+        documents = list(
+            Document.objects.filter(processing_status=Document.Status.COMPLETED)
+            .exclude(index_entries__index=index)
+            .order_by('id')
+        )
+        if not documents:
+            self.stdout.write("Nothing to backfill")
+            return
+
+        def backfill(document):
+            try:
+                return backfill_document(document, index, source)
+            finally:
+                connections.close_all()
+
+        started = time.monotonic()
+        vectors = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(backfill, document): document for document in documents}
+            for future in as_completed(futures):
+                document = futures[future]
+                try:
+                    written = future.result()
+                    vectors += written
+                    self.stdout.write(f"Document {document.id}: {written} vectors")
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Document {document.id} failed: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {len(documents) - failed} documents ({vectors} vectors) "
+            f"in {time.monotonic() - started:.1f}s, {failed} failed"
+        ))
+
+    def _status(self, options):
+        index = self._building()
+        report = check_parity(index)
+
+        self.stdout.write(f"Active index: {active_index(refresh=True).name} ({report['active_vectors']} vectors)")
+        self.stdout.write(f"Building index: {index.name} ({report['index_vectors']} vectors)")
+        self.stdout.write(f"Documents not yet backfilled: {len(report['missing_documents'])}")
+        self.stdout.write(f"Documents mid-ingestion: {report['in_flight']}")
+        for namespace, counts in sorted(report['mismatched_namespaces'].items()):
+            self.stdout.write(
+                f"Namespace {namespace}: expected {counts['expected']}, index reports {counts['actual']}"
+            )
+
+        if report['ok']:
+            self.stdout.write(self.style.SUCCESS("Parity OK; ready for cutover"))
+        else:
+            self.stdout.write(self.style.WARNING("Not ready for cutover"))
+        return report
+
+    def _cutover(self, options):
+        index = self._building()
+        report = self._status(options)
+        if not report['ok'] and not options['force']:
+            raise CommandError("Parity check failed; run `rebuild_index build` or wait, or use --force")
+
+        previous = active_index(refresh=True)
+        activate_index(index)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reads now use {index.name}; {previous.name} is retired and can be dropped"
+        ))
+
+    def _drop(self, options):
+        index = VectorIndex.objects.filter(name=options['name']).first()
+        if index is None:
+            raise CommandError(f"Unknown index {options['name']}")
+        if index.status == VectorIndex.Status.ACTIVE:
+            raise CommandError("The active index cannot be dropped")
+
+        get_pinecone_client(index).delete_index()
+        index.delete()
+        self.stdout.write(self.style.SUCCESS(f"Dropped {options['name']}"))
@@ -0,0 +1,121 @@
+"""
+Garbage-collect orphaned vectors and re-queue documents with missing vectors
+
+Usage:
+    python manage.py reconcile_vectors [--max-namespaces N] [--full] [--dry-run]
+        [--no-requeue] [--workers 4]
+
+Each run checks the next slice of namespaces of the active index (resuming
+where the previous run stopped) and records a ReconciliationRun with a
+per-namespace report. Namespaces whose stats count matches the manifests
+are skipped without listing IDs unless --full is given.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from documents.indexes import active_index
+from documents.models import Document, ReconciliationRun
+from documents.pinecone_client import get_pinecone_client
+from documents.reconcile import next_namespaces, reconcile_namespace, requeue_documents
+from documents.tasks import process_document
+
+
+class Command(BaseCommand):
+    help = "Delete vectors of documents that no longer exist and re-queue documents missing vectors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-namespaces', type=int, default=0,
+                            help="Namespaces checked in this run (0 = all)")
+        parser.add_argument('--full', action='store_true',
+                            help="List every namespace's IDs, even when the counts agree")
+        parser.add_argument('--dry-run', action='store_true', help="Report without deleting or re-queueing")
+        parser.add_argument('--no-requeue', action='store_true',
+                            help="Report documents with missing vectors but do not reprocess them")
+        parser.add_argument('--workers', type=int, default=4, help="Documents reprocessed concurrently")
+
+    def handle(self, *args, **options):
+        index = active_index(refresh=True)
+        pinecone_client = get_pinecone_client(index)
+
+        # Namespaces with vectors, plus those whose vectors are all gone
+        counts = pinecone_client.namespace_counts()
+        expected_namespaces = (
+            Document.objects.filter(processing_status=Document.Status.COMPLETED, vector_count__gt=0)
+            .values_list('vector_namespace', flat=True)
+            .distinct()
+        )
+        namespaces = next_namespaces(
+            index.name,
+            sorted(set(counts) | set(expected_namespaces)),
+            options['max_namespaces']
+        )
+
+        run = ReconciliationRun.objects.create(index_name=index.name, dry_run=options['dry_run'])
+        missing = []
+
+        for namespace in namespaces:
+            label = namespace or '(default)'
+            try:
+                report = reconcile_namespace(
+                    pinecone_client,
+                    namespace,
+                    counts.get(namespace, 0),
+                    full=options['full'],
+                    dry_run=options['dry_run']
+                )
+            except Exception as e:
+                report = {'error': str(e)}
+                self.stderr.write(f"Namespace {label}: {str(e)}")
+            else:
+                missing.extend(report['missing_documents'])
+                if report['listed']:
+                    self.stdout.write(
+                        f"Namespace {label}: {report['vectors']} vectors, {report['expected']} expected, "
+                        f"{report['orphans']} orphaned ({len(report['orphan_documents'])} deleted documents, "
+                        f"{len(report['failed_documents'])} failed documents), "
+                        f"{len(report['missing_documents'])} documents missing vectors"
+                    )
+                else:
+                    self.stdout.write(f"Namespace {label}: {report['vectors']} vectors, consistent")
+
+            # Saved per namespace so an interrupted run still advances the cursor
+            run.report[namespace] = report
+            run.last_namespace = namespace
+            run.namespaces_checked += 1
+            run.orphans_deleted += report.get('deleted', 0)
+            run.save()
+
+        requeued = []
+        if missing and not options['dry_run'] and not options['no_requeue']:
+            requeued = requeue_documents(missing)
+            run.documents_requeued = len(requeued)
+            run.save(update_fields=['documents_requeued'])
+            self._reprocess(requeued, options['workers'])
+
+        run.finished_at = timezone.now()
+        run.save(update_fields=['finished_at'])
+
+        verb = "would delete" if options['dry_run'] else "deleted"
+        orphans = sum(report.get('orphans', 0) for report in run.report.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {run.namespaces_checked} namespaces of {index.name}: {verb} "
+            f"{orphans} orphaned vectors, {len(missing)} documents missing vectors, {len(requeued)} re-queued"
+        ))
+
+    def _reprocess(self, document_ids, workers):
+        def reprocess(document_id):
+            try:
+                return process_document(document_id, resume_when_paused=False)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(reprocess, document_id): document_id for document_id in document_ids}
+            for future in as_completed(futures):
+                document_id = futures[future]
+                if future.result() is None:
+                    self.stderr.write(f"Document {document_id}: not reprocessed (failed or paused)")
+                else:
+                    self.stdout.write(f"Document {document_id}: vectors restored")
@@ -0,0 +1,29 @@
+"""
+Pre-build API clients and verify upstream services
+
+Usage:
+    python manage.py warmup
+
+Runs the same checks as a web worker's warmup, but in this process: use
+it to verify configuration before a deploy. Running workers warm
+themselves at startup (WARMUP_ON_STARTUP) or on their first readiness probe.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from documents.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Build OpenAI/Pinecone clients, open connection pools and verify the index"
+
+    def handle(self, *args, **options):
+        state = warm_up()
+
+        for name, result in state['checks'].items():
+            style = self.style.SUCCESS if result == 'ok' else self.style.ERROR
+            self.stdout.write(style(f"{name}: {result}"))
+
+        if not state['warm']:
+            raise CommandError("Warmup failed")
+
+        self.stdout.write(self.style.SUCCESS("All upstream checks passed"))
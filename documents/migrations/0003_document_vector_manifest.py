@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_document_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='vector_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='vector_id_scheme',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
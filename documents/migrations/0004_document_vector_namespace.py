@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_document_vector_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='vector_namespace',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
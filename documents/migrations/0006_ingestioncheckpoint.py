@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('chunk_overlap', models.PositiveIntegerField()),
+                ('pages_total', models.PositiveIntegerField(default=0)),
+                ('page_texts', models.JSONField(default=list)),
+                ('upserted_ranges', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint', to='documents.document')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 17:05
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_embedding_model(apps, schema_editor):
+    # Every vector written before this migration came from ada-002
+    Document = apps.get_model('documents', 'Document')
+    Document.objects.filter(Q(vector_count__gt=0) | Q(processing_status='COMPLETED')).update(
+        embedding_model='text-embedding-ada-002',
+        embedding_dimension=1536
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0006_ingestioncheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='embedding_dimension',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='embedding_model',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(backfill_embedding_model, migrations.RunPython.noop),
+    ]
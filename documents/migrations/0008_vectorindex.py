@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0007_document_embedding_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=45, unique=True)),
+                ('status', models.CharField(choices=[('BUILDING', 'Building'), ('ACTIVE', 'Active'), ('RETIRED', 'Retired')], default='BUILDING', max_length=20)),
+                ('embedding_model', models.CharField(max_length=100)),
+                ('embedding_dimension', models.PositiveIntegerField()),
+                ('chunk_size', models.PositiveIntegerField(default=1000)),
+                ('chunk_overlap', models.PositiveIntegerField(default=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VectorIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vector_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_entries', to='documents.document')),
+                ('index', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='documents.vectorindex')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('index', 'document'), name='unique_index_entry')],
+            },
+        ),
+    ]
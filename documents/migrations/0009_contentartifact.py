@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_vectorindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('chunk_overlap', models.PositiveIntegerField()),
+                ('embedding_model', models.CharField(max_length=100)),
+                ('embedding_dimension', models.PositiveIntegerField()),
+                ('page_texts', models.JSONField(default=list)),
+                ('chunks', models.JSONField(default=list)),
+                ('embeddings', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'chunk_size', 'chunk_overlap', 'embedding_model', 'embedding_dimension'), name='unique_content_artifact')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_contentartifact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index_name', models.CharField(max_length=45)),
+                ('dry_run', models.BooleanField(default=False)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_namespace', models.CharField(blank=True, default='', max_length=100)),
+                ('namespaces_checked', models.PositiveIntegerField(default=0)),
+                ('orphans_deleted', models.PositiveIntegerField(default=0)),
+                ('documents_requeued', models.PositiveIntegerField(default=0)),
+                ('report', models.JSONField(default=dict)),
+            ],
+        ),
+    ]
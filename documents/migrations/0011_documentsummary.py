@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_reconciliationrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('CHUNK_GROUP', 'Chunk group'), ('SECTION', 'Section'), ('DOCUMENT', 'Document')], max_length=20)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('page_start', models.PositiveIntegerField(blank=True, null=True)),
+                ('page_end', models.PositiveIntegerField(blank=True, null=True)),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='documents.document')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('document', 'level', 'position'), name='unique_summary_node')],
+            },
+        ),
+    ]
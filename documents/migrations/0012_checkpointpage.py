@@ -0,0 +1,42 @@
+# Generated by Django 6.0
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_page_texts(apps, schema_editor):
+    # Keep interrupted ingestions resumable across the schema change
+    IngestionCheckpoint = apps.get_model('documents', 'IngestionCheckpoint')
+    CheckpointPage = apps.get_model('documents', 'CheckpointPage')
+    for checkpoint in IngestionCheckpoint.objects.exclude(page_texts=[]).iterator():
+        CheckpointPage.objects.bulk_create([
+            CheckpointPage(checkpoint=checkpoint, page_index=index, text=text or '')
+            for index, text in enumerate(checkpoint.page_texts)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0011_documentsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckpointPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_index', models.PositiveIntegerField()),
+                ('text', models.TextField(blank=True, default='')),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='documents.ingestioncheckpoint')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('checkpoint', 'page_index'), name='unique_checkpoint_page')],
+            },
+        ),
+        migrations.RunPython(move_page_texts, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='ingestioncheckpoint',
+            name='page_texts',
+        ),
+    ]
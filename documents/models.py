@@ -1,6 +1,10 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
+from datetime import timedelta
+from .circuit_breaker import open_circuits
+import numpy as np
 
 class Document(models.Model):
     class Status(models.TextChoices):
@@ -22,6 +26,331 @@ class Document(models.Model):
         default=Status.PENDING
     )
     error_message = models.TextField(blank=True, null=True)
+    # SHA-256 of the uploaded file, used to skip re-ingesting identical files
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+
+    # Fine-grained ingestion progress, written by process_document
+    pages_total = models.PositiveIntegerField(default=0)
+    pages_extracted = models.PositiveIntegerField(default=0)
+    chunks_total = models.PositiveIntegerField(default=0)
+    chunks_embedded = models.PositiveIntegerField(default=0)
+    vectors_upserted = models.PositiveIntegerField(default=0)
+    progress_updated_at = models.DateTimeField(blank=True, null=True)
+
+    # Vector manifest: every vector ID is derived from the scheme and count,
+    # so deletion can target exact IDs instead of a metadata filter
+    vector_count = models.PositiveIntegerField(default=0)
+    vector_id_scheme = models.CharField(max_length=100, blank=True, default='')
+    # Pinecone namespace holding the vectors; '' is the shared default
+    # namespace used before per-user namespaces
+    vector_namespace = models.CharField(max_length=100, blank=True, default='')
+    # Embedding model and dimension the vectors were created with; an index
+    # never mixes vectors from different models or dimensions
+    embedding_model = models.CharField(max_length=100, blank=True, default='')
+    embedding_dimension = models.PositiveIntegerField(default=0)
+
+    VECTOR_ID_SCHEME = 'doc_{document_id}_chunk_{chunk_index}'
+
+    # Relative weight of each ingestion stage in the overall percentage
+    PROGRESS_WEIGHTS = {'extract': 0.2, 'embed': 0.5, 'upsert': 0.3}
 
     def __str__(self):
         return self.title
+
+    def vector_id(self, chunk_index, scheme=None):
+        """Vector ID for one chunk of this document"""
+        scheme = scheme or self.vector_id_scheme or self.VECTOR_ID_SCHEME
+        return scheme.format(document_id=self.id, chunk_index=chunk_index)
+
+    def vector_ids(self, start=0):
+        """All vector IDs recorded in the manifest, optionally from `start` onwards"""
+        if not self.vector_id_scheme:
+            return []
+        return [self.vector_id(i) for i in range(start, self.vector_count)]
+
+    @property
+    def is_active(self):
+        return self.processing_status in (self.Status.PENDING, self.Status.PROCESSING)
+
+    @property
+    def is_stalled(self):
+        """Active but without progress for DOCUMENT_STALE_AFTER (its worker or scheduled resume is gone)"""
+        if not self.is_active:
+            return False
+        # Ingestion waiting out an outage writes no progress but is alive
+        if open_circuits():
+            return False
+        stale_before = timezone.now() - timedelta(seconds=settings.DOCUMENT_STALE_AFTER)
+        return self.progress_updated_at is None or self.progress_updated_at < stale_before
+
+    @property
+    def is_retryable(self):
+        return self.processing_status == self.Status.FAILED or self.is_stalled
+
+    @property
+    def progress_percent(self):
+        """Overall ingestion progress (0-100) derived from the stage counters"""
+        if self.processing_status == self.Status.COMPLETED:
+            return 100
+
+        def ratio(done, total):
+            return min(done / total, 1.0) if total else 0.0
+
+        weights = self.PROGRESS_WEIGHTS
+        percent = (
+            weights['extract'] * ratio(self.pages_extracted, self.pages_total)
+            + weights['embed'] * ratio(self.chunks_embedded, self.chunks_total)
+            + weights['upsert'] * ratio(self.vectors_upserted, self.chunks_total)
+        )
+        return int(percent * 100)
+
+    def progress_dict(self):
+        """Serializable progress snapshot used by the status endpoints"""
+        return {
+            'id': self.id,
+            'status': self.processing_status,
+            'status_display': self.get_processing_status_display(),
+            'pages_total': self.pages_total,
+            'pages_extracted': self.pages_extracted,
+            'chunks_total': self.chunks_total,
+            'chunks_embedded': self.chunks_embedded,
+            'vectors_upserted': self.vectors_upserted,
+            'percent': self.progress_percent,
+            'error_message': self.error_message,
+        }
+
+
+class IngestionCheckpoint(models.Model):
+    """
+    Persisted progress of an interrupted ingestion
+
+    Holds the page texts extracted so far (as CheckpointPage rows) and the
+    chunk ranges whose vectors Pinecone has confirmed, so a retry skips
+    finished work. Removed once the document completes.
+    """
+
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, related_name='checkpoint')
+    # Fingerprint of the inputs; a checkpoint is only reused if they match
+    content_hash = models.CharField(max_length=64)
+    chunk_size = models.PositiveIntegerField()
+    chunk_overlap = models.PositiveIntegerField()
+
+    pages_total = models.PositiveIntegerField(default=0)
+    # Chunk index ranges [start, end) confirmed upserted, kept merged and sorted
+    upserted_ranges = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Checkpoint for {self.document}"
+
+    @property
+    def pages_extracted(self):
+        return self.pages.count()
+
+    @property
+    def extraction_complete(self):
+        return self.pages_total > 0 and self.pages_extracted >= self.pages_total
+
+    def page_texts(self):
+        """Extracted text of every checkpointed page, in order"""
+        return list(self.pages.order_by('page_index').values_list('text', flat=True))
+
+    def matches(self, content_hash, chunk_size, chunk_overlap):
+        return (
+            self.content_hash == content_hash
+            and self.chunk_size == chunk_size
+            and self.chunk_overlap == chunk_overlap
+        )
+
+    def upserted_indices(self):
+        return {i for start, end in self.upserted_ranges for i in range(start, end)}
+
+    def add_upserted(self, indices):
+        """Merge newly confirmed chunk indices into upserted_ranges"""
+        ranges = []
+        for index in sorted(self.upserted_indices() | set(indices)):
+            if ranges and ranges[-1][1] == index:
+                ranges[-1][1] = index + 1
+            else:
+                ranges.append([index, index + 1])
+        self.upserted_ranges = ranges
+
+
+class CheckpointPage(models.Model):
+    """
+    Text of one extracted page of an interrupted ingestion
+
+    One row per page, appended as extraction proceeds, so checkpointing
+    writes only the new pages instead of re-serializing every page so far.
+    """
+
+    checkpoint = models.ForeignKey(IngestionCheckpoint, on_delete=models.CASCADE, related_name='pages')
+    page_index = models.PositiveIntegerField()
+    text = models.TextField(blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['checkpoint', 'page_index'], name='unique_checkpoint_page'),
+        ]
+
+    def __str__(self):
+        return f"Page {self.page_index} of {self.checkpoint}"
+
+
+class ContentArtifact(models.Model):
+    """
+    Processed output of one file content, shared by identical uploads
+
+    Keyed by the file's SHA-256 plus everything the output depends on, so a
+    new Document with known content skips extraction and embedding and only
+    writes vectors under its own IDs.
+    """
+
+    content_hash = models.CharField(max_length=64)
+    chunk_size = models.PositiveIntegerField()
+    chunk_overlap = models.PositiveIntegerField()
+    embedding_model = models.CharField(max_length=100)
+    embedding_dimension = models.PositiveIntegerField()
+
+    page_texts = models.JSONField(default=list)
+    # Chunk dicts without the per-document fields (document_id, document_title)
+    chunks = models.JSONField(default=list)
+    # float32 matrix of shape (len(chunks), embedding_dimension), row-major
+    embeddings = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    DOCUMENT_FIELDS = ('document_id', 'document_title')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_hash', 'chunk_size', 'chunk_overlap', 'embedding_model', 'embedding_dimension'],
+                name='unique_content_artifact'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.embedding_model})"
+
+    def chunks_for(self, document):
+        """The stored chunks, labelled as belonging to `document`"""
+        return [
+            {**chunk, 'document_id': document.id, 'document_title': document.title}
+            for chunk in self.chunks
+        ]
+
+    def embedding_matrix(self):
+        return np.frombuffer(bytes(self.embeddings), dtype=np.float32).reshape(
+            len(self.chunks), self.embedding_dimension
+        )
+
+
+class VectorIndex(models.Model):
+    """
+    A vector index and the settings its vectors were built with
+
+    Exactly one index is ACTIVE and serves all reads. A BUILDING index is
+    being filled in the background for a blue/green rebuild: new ingestions
+    are dual-written to it, and it becomes ACTIVE in one transaction at
+    cutover. The ACTIVE row is the read pointer.
+    """
+
+    class Status(models.TextChoices):
+        BUILDING = 'BUILDING', 'Building'
+        ACTIVE = 'ACTIVE', 'Active'
+        RETIRED = 'RETIRED', 'Retired'
+
+    name = models.CharField(max_length=45, unique=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.BUILDING)
+    embedding_model = models.CharField(max_length=100)
+    embedding_dimension = models.PositiveIntegerField()
+    chunk_size = models.PositiveIntegerField(default=1000)
+    chunk_overlap = models.PositiveIntegerField(default=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+    @property
+    def embedding(self):
+        return self.embedding_model, self.embedding_dimension
+
+
+class VectorIndexEntry(models.Model):
+    """
+    Vectors of one document written to a BUILDING index
+
+    The ACTIVE index's vectors are described by the Document's own manifest;
+    these rows replace that manifest when their index is activated.
+    """
+
+    index = models.ForeignKey(VectorIndex, on_delete=models.CASCADE, related_name='entries')
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='index_entries')
+    vector_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['index', 'document'], name='unique_index_entry'),
+        ]
+
+    def __str__(self):
+        return f"{self.document} in {self.index.name}"
+
+
+class ReconciliationRun(models.Model):
+    """
+    One pass of the orphan-vector reconciliation job
+
+    Runs are incremental: each checks a slice of the active index's
+    namespaces, starting after the last namespace the previous run got to,
+    and records per namespace what it deleted and re-queued.
+    """
+
+    index_name = models.CharField(max_length=45)
+    dry_run = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Last namespace checked; the next run resumes after it
+    last_namespace = models.CharField(max_length=100, blank=True, default='')
+    namespaces_checked = models.PositiveIntegerField(default=0)
+    orphans_deleted = models.PositiveIntegerField(default=0)
+    documents_requeued = models.PositiveIntegerField(default=0)
+    report = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Reconciliation of {self.index_name} at {self.started_at}"
+
+
+class DocumentSummary(models.Model):
+    """
+    One node of a document's summary tree
+
+    CHUNK_GROUP nodes summarize runs of consecutive chunks, SECTION nodes
+    summarize runs of group summaries, and the single DOCUMENT node
+    summarizes the sections. Overview questions are answered from these
+    instead of from a handful of retrieved chunks.
+    """
+
+    class Level(models.TextChoices):
+        CHUNK_GROUP = 'CHUNK_GROUP', 'Chunk group'
+        SECTION = 'SECTION', 'Section'
+        DOCUMENT = 'DOCUMENT', 'Document'
+
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='summaries')
+    level = models.CharField(max_length=20, choices=Level.choices)
+    # Order of the node within its level
+    position = models.PositiveIntegerField(default=0)
+    page_start = models.PositiveIntegerField(blank=True, null=True)
+    page_end = models.PositiveIntegerField(blank=True, null=True)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'level', 'position'], name='unique_summary_node'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_level_display()} summary {self.position} of {self.document}"
@@ -3,64 +3,372 @@ OpenAI Client for AxonFlow AI
 Handles embeddings and chat completions
 """
 
-from openai import OpenAI
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 from django.conf import settings
+from .circuit_breaker import CircuitOpen, get_breaker
+from .rate_limiter import get_rate_limiter, PRIORITY_BULK, PRIORITY_INTERACTIVE
+from .singleflight import SingleFlight
+from usage.ledger import record_usage
+from usage.models import UsageEvent
+import asyncio
+import base64
+import numpy as np
+import random
+import threading
+import time
+
+# Concurrent identical query embeddings share one API call
+embedding_flights = SingleFlight()
+
+# Known embedding models: (native dimension, supports shortened output)
+EMBEDDING_MODELS = {
+    'text-embedding-ada-002': (1536, False),
+    'text-embedding-3-small': (1536, True),
+    'text-embedding-3-large': (3072, True),
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_openai_client(
+    priority: str = PRIORITY_INTERACTIVE,
+    embedding: Optional[Tuple[str, int]] = None
+) -> 'OpenAIClient':
+    """
+    Shared OpenAIClient for a priority lane and embedding configuration
+    
+    The underlying SDK client is thread-safe and keeps a connection pool, so
+    reusing it avoids per-request construction and TLS handshakes.
+    
+    Args:
+        priority: Rate-limiter lane
+        embedding: (model, dimension) to embed with, e.g. VectorIndex.embedding;
+            defaults to the configured embedding_config()
+    """
+    key = (priority, embedding)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = OpenAIClient(priority=priority, embedding=embedding)
+    return client
+
+
+def decode_embeddings(items) -> np.ndarray:
+    """
+    Decode embedding response items into one contiguous float32 matrix
+    
+    Base64 payloads are viewed in place with np.frombuffer and copied once
+    into the result, instead of being parsed into boxed Python floats.
+    
+    Args:
+        items: response.data from an embeddings call
+        
+    Returns:
+        Array of shape (len(items), dimension), rows in input order
+    """
+    items = sorted(items, key=lambda item: item.index)
+    rows = [
+        np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+        if isinstance(item.embedding, str)
+        else np.asarray(item.embedding, dtype=np.float32)
+        for item in items
+    ]
+    
+    embeddings = np.empty((len(rows), len(rows[0]) if rows else 0), dtype=np.float32)
+    for i, row in enumerate(rows):
+        embeddings[i] = row
+    return embeddings
+
+
+def embedding_config() -> Tuple[str, int]:
+    """
+    Configured embedding model and output dimension
+    
+    Returns:
+        (model, dimension) from OPENAI_EMBEDDING_MODEL and EMBEDDING_DIMENSION
+    """
+    return validate_embedding(settings.OPENAI_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION)
+
+
+def validate_embedding(model: str, dimension: int) -> Tuple[str, int]:
+    """
+    Check a model and dimension combination
+    
+    Args:
+        model: Embedding model name
+        dimension: Requested dimension; 0 means the model's native size
+        
+    Returns:
+        (model, dimension) with the dimension resolved
+        
+    Raises:
+        ValueError: If the dimension is not valid for the model
+    """
+    native, shortenable = EMBEDDING_MODELS.get(model, (None, False))
+    
+    if native is None:
+        if not dimension:
+            raise ValueError(f"A dimension must be given for unknown embedding model {model}")
+        return model, dimension
+    
+    dimension = dimension or native
+    if dimension > native:
+        raise ValueError(f"{model} produces at most {native} dimensions, not {dimension}")
+    if dimension < native and not shortenable:
+        raise ValueError(f"{model} does not support shortened embeddings")
+    return model, dimension
+
+
+def reduce_dimension(embeddings: np.ndarray, dimension: int) -> np.ndarray:
+    """
+    Shorten embeddings to their first `dimension` components, renormalized
+    
+    Only meaningful for models trained so that prefixes remain embeddings
+    (text-embedding-3-*); renormalizing restores unit length for cosine.
+    
+    Args:
+        embeddings: float32 array of shape (n, native dimension)
+        dimension: Target dimension
+    
+    Returns:
+        float32 array of shape (n, dimension)
+    """
+    if embeddings.shape[1] <= dimension:
+        return embeddings
+    
+    reduced = np.ascontiguousarray(embeddings[:, :dimension])
+    norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    reduced /= norms
+    return reduced
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for rate-limit budgeting"""
+    return len(text) // 4 + 1
 
 
 class OpenAIClient:
     """Client for OpenAI API operations"""
     
-    def __init__(self):
-        """Initialize OpenAI client"""
+    def __init__(self, priority: str = PRIORITY_INTERACTIVE, embedding: Optional[Tuple[str, int]] = None):
+        """
+        Initialize OpenAI client
+        
+        Args:
+            priority: Rate-limiter lane; PRIORITY_BULK for background ingestion
+            embedding: (model, dimension) to embed with; defaults to embedding_config()
+        """
         self.api_key = settings.OPENAI_API_KEY
         
         if not self.api_key:
             raise ValueError("OpenAI API key must be set in settings")
         
-        self.client = OpenAI(api_key=self.api_key)
-        self.embedding_model = "text-embedding-ada-002"
+        # Imported lazily so loading views and management commands stays fast
+        import openai
+        
+        # Retries are handled here, coordinated with the shared rate limiter
+        self.client = openai.OpenAI(
+            api_key=self.api_key,
+            max_retries=0,
+            timeout=settings.OPENAI_REQUEST_TIMEOUT
+        )
+        
+        # Errors worth retrying; anything else (bad request, auth) fails immediately
+        self.retryable_errors = (
+            openai.APIConnectionError,
+            openai.APITimeoutError,
+            openai.InternalServerError,
+            openai.RateLimitError,
+        )
+        self.embedding_model, self.embedding_dimension = (
+            validate_embedding(*embedding) if embedding else embedding_config()
+        )
         self.chat_model = "gpt-3.5-turbo"
+        self.priority = priority
+        self.rate_limiter = get_rate_limiter()
+        self.breaker = get_breaker('openai')
+        self.max_retries = settings.OPENAI_MAX_RETRIES
+    
+    @property
+    def embedding_stage(self) -> str:
+        """Ledger stage for embedding calls made by this client"""
+        if self.priority == PRIORITY_BULK:
+            return UsageEvent.Stage.INGEST_EMBEDDING
+        return UsageEvent.Stage.QUERY_EMBEDDING
     
-    def create_embedding(self, text: str) -> List[float]:
+    def _call(self, func: Callable, estimated_tokens: int, stage: str, **kwargs):
+        """
+        Call the OpenAI API through the shared rate limiter, with retries
+        
+        Retryable failures back off exponentially with full jitter, honoring
+        a Retry-After header when the API sends one. Token usage of the
+        successful attempt is recorded in the usage ledger.
+        
+        Every attempt goes through the 'openai' circuit breaker. While it is
+        open, bulk (ingestion) calls wait for it to half-open instead of
+        failing; interactive calls raise CircuitOpen at once.
+        
+        Args:
+            func: SDK method to call
+            estimated_tokens: Tokens to reserve from the shared budget
+            stage: UsageEvent.Stage the call is accounted under
+            **kwargs: Arguments for func
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(
+                estimated_tokens,
+                priority=self.priority,
+                timeout=settings.OPENAI_RATE_LIMIT_TIMEOUT
+            )
+            self.breaker.acquire(block=self.priority == PRIORITY_BULK)
+            started = time.monotonic()
+            try:
+                response = func(**kwargs)
+            except self.retryable_errors as e:
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                
+                delay = random.uniform(0, min(30.0, 0.5 * (2 ** attempt)))
+                response = getattr(e, 'response', None)
+                retry_after = response.headers.get('retry-after') if response is not None else None
+                if retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                time.sleep(delay)
+                continue
+            except Exception:
+                # The API answered; the request itself was rejected
+                self.breaker.record_success(time.monotonic() - started)
+                raise
+            
+            latency = time.monotonic() - started
+            self.breaker.record_success(latency)
+            record_usage(
+                stage,
+                kwargs.get('model', ''),
+                getattr(response, 'usage', None),
+                latency * 1000
+            )
+            return response
+    
+    def _embed(self, texts, estimated_tokens: int) -> np.ndarray:
+        """
+        One embeddings API call at the configured model and dimension
+        
+        Shortened dimensions are requested from the API; anything wider that
+        comes back is truncated and renormalized locally.
+        
+        Args:
+            texts: Text or list of texts (already truncated)
+            estimated_tokens: Tokens to reserve from the shared budget
+            
+        Returns:
+            float32 array of shape (len(texts), embedding_dimension)
+        """
+        kwargs = {}
+        native = EMBEDDING_MODELS.get(self.embedding_model, (None, False))[0]
+        if native is not None and self.embedding_dimension < native:
+            kwargs['dimensions'] = self.embedding_dimension
+        
+        response = self._call(
+            self.client.embeddings.create,
+            estimated_tokens=estimated_tokens,
+            stage=self.embedding_stage,
+            model=self.embedding_model,
+            input=texts,
+            encoding_format='base64',
+            **kwargs
+        )
+        
+        embeddings = reduce_dimension(decode_embeddings(response.data), self.embedding_dimension)
+        if embeddings.shape[1] != self.embedding_dimension:
+            raise ValueError(
+                f"{self.embedding_model} returned {embeddings.shape[1]} dimensions, "
+                f"expected {self.embedding_dimension}"
+            )
+        return embeddings
+    
+    def create_embedding(self, text: str, coalesce: bool = True) -> np.ndarray:
         """
         Create embedding vector for text
         
+        Concurrent calls for the same model and text are coalesced into one
+        API request.
+        
         Args:
             text: Text to embed
+            coalesce: Share an identical in-flight request; False forces a
+                separate one (used for hedged requests)
             
         Returns:
-            Embedding vector (list of floats)
+            Embedding vector (float32 array, read-only as it may be shared)
         """
-        try:
-            # Truncate text if too long (max 8191 tokens for ada-002)
-            if len(text) > 8000:
-                text = text[:8000]
-            
-            response = self.client.embeddings.create(
-                model=self.embedding_model,
-                input=text
-            )
+        # Truncate text if too long (max 8191 tokens for ada-002)
+        text = text[:8000]
+        if not coalesce:
+            return self._create_embedding(text)
+        return embedding_flights.do(
+            (self.embedding_model, self.embedding_dimension, text),
+            lambda: self._create_embedding(text)
+        )
+    
+    async def acreate_embedding(self, text: str) -> np.ndarray:
+        """
+        Async variant of create_embedding, coalesced with sync callers too
+        
+        Args:
+            text: Text to embed
             
-            return response.data[0].embedding
+        Returns:
+            Embedding vector (float32 array, read-only as it may be shared)
+        """
+        text = text[:8000]
+        return await embedding_flights.do_async(
+            (self.embedding_model, self.embedding_dimension, text),
+            lambda: asyncio.to_thread(self._create_embedding, text)
+        )
+    
+    def _create_embedding(self, text: str) -> np.ndarray:
+        """Embed one (already truncated) text with a single API call"""
+        try:
+            embedding = self._embed(text, estimate_tokens(text))[0]
+            embedding.flags.writeable = False
+            return embedding
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             raise Exception(f"Error creating embedding: {str(e)}")
     
-    def create_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    def iter_embeddings_batch(
+        self,
+        texts: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Iterator[np.ndarray]:
         """
-        Create embeddings for multiple texts
+        Create embeddings for multiple texts, yielding one API batch at a time
+        
+        Lets callers start consuming (e.g. upserting) embeddings before the
+        whole document has been embedded.
         
         Args:
             texts: List of texts to embed
+            progress_callback: Optional callable receiving (texts_done, total_texts)
             
-        Returns:
-            List of embedding vectors
+        Yields:
+            float32 array of shape (batch size, dimension) per batch, in input order
         """
         try:
             # Process in batches to avoid rate limits
             batch_size = 20
-            all_embeddings = []
+            done = 0
             
             for i in range(0, len(texts), batch_size):
                 batch = texts[i:i + batch_size]
@@ -68,19 +376,46 @@ class OpenAIClient:
                 # Truncate each text
                 batch = [text[:8000] if len(text) > 8000 else text for text in batch]
                 
-                response = self.client.embeddings.create(
-                    model=self.embedding_model,
-                    input=batch
-                )
+                batch_embeddings = self._embed(batch, sum(estimate_tokens(text) for text in batch))
+                done += len(batch_embeddings)
                 
-                batch_embeddings = [item.embedding for item in response.data]
-                all_embeddings.extend(batch_embeddings)
-            
-            return all_embeddings
+                if progress_callback:
+                    progress_callback(done, len(texts))
+                
+                yield batch_embeddings
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             raise Exception(f"Error creating batch embeddings: {str(e)}")
     
+    def create_embeddings_batch(
+        self,
+        texts: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> np.ndarray:
+        """
+        Create embeddings for multiple texts
+        
+        Args:
+            texts: List of texts to embed
+            progress_callback: Optional callable receiving (texts_done, total_texts)
+            
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        all_embeddings = None
+        done = 0
+        for batch_embeddings in self.iter_embeddings_batch(texts, progress_callback):
+            if all_embeddings is None:
+                all_embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+            all_embeddings[done:done + len(batch_embeddings)] = batch_embeddings
+            done += len(batch_embeddings)
+        
+        if all_embeddings is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return all_embeddings
+    
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -101,7 +436,11 @@ class OpenAIClient:
             Response text or stream object
         """
         try:
-            response = self.client.chat.completions.create(
+            prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+            response = self._call(
+                self.client.chat.completions.create,
+                estimated_tokens=prompt_tokens + max_tokens,
+                stage=UsageEvent.Stage.COMPLETION,
                 model=self.chat_model,
                 messages=messages,
                 temperature=temperature,
@@ -114,6 +453,8 @@ class OpenAIClient:
             else:
                 return response.choices[0].message.content
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             raise Exception(f"Error in chat completion: {str(e)}")
     
@@ -121,7 +462,8 @@ class OpenAIClient:
         self,
         query: str,
         context_chunks: List[str],
-        conversation_history: Optional[List[Dict]] = None
+        conversation_history: Optional[List[Dict]] = None,
+        max_tokens: int = 1000
     ) -> str:
         """
         Generate RAG response using retrieved context
@@ -130,6 +472,7 @@ class OpenAIClient:
             query: User's question
             context_chunks: Retrieved relevant text chunks
             conversation_history: Previous messages in conversation
+            max_tokens: Maximum tokens in the answer
             
         Returns:
             AI-generated response
@@ -169,10 +512,12 @@ Context:
             response = self.chat_completion(
                 messages=messages,
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=max_tokens
             )
             
             return response
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             raise Exception(f"Error generating RAG response: {str(e)}")
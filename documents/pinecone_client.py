@@ -3,30 +3,125 @@ Pinecone Vector Database Client for AxonFlow AI
 Handles vector storage and semantic search
 """
 
-from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 from django.conf import settings
+from .circuit_breaker import CircuitOpen, get_breaker
+from .openai_client import embedding_config
+from .singleflight import SingleFlight, fingerprint_vector
+import asyncio
+import json
+import random
+import threading
 import time
 
+try:
+    # Transport errors of the HTTP client the pinecone SDK is built on
+    from httpx import TransportError as _HTTPTransportError
+    _TRANSPORT_ERRORS = (ConnectionError, TimeoutError, _HTTPTransportError)
+except ImportError:
+    _TRANSPORT_ERRORS = (ConnectionError, TimeoutError)
+
+
+# Concurrent identical queries share one Pinecone request
+query_flights = SingleFlight()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _is_outage(error: Exception) -> bool:
+    """
+    Whether a failed request points at Pinecone being unhealthy
+
+    Transport errors, 429 and 5xx responses count, as they do for the
+    OpenAI breaker; other 4xx responses mean Pinecone rejected this request
+    and say nothing about its health.
+    """
+    status = getattr(error, 'status', None)
+    if status is None:
+        status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+
+def get_pinecone_client(index=None) -> 'PineconeClient':
+    """
+    Shared PineconeClient for a vector index
+    
+    Keeps the resolved index handle (and its connection pool) across
+    requests instead of looking the index up on every call.
+    
+    Args:
+        index: VectorIndex to use; defaults to the active one, which is
+            what every read should go through
+    """
+    if index is None:
+        from .indexes import active_index
+        index = active_index()
+    
+    client = _clients.get(index.name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(index.name)
+            if client is None:
+                client = _clients[index.name] = PineconeClient(index.name, index.embedding)
+    return client
+
 
 class PineconeClient:
     """Client for Pinecone vector database operations"""
     
-    def __init__(self):
-        """Initialize Pinecone client"""
+    def __init__(self, index_name: Optional[str] = None, embedding: Optional[Tuple[str, int]] = None):
+        """
+        Initialize Pinecone client
+        
+        Args:
+            index_name: Index to operate on; defaults to PINECONE_INDEX_NAME
+            embedding: (model, dimension) of the index's vectors; defaults
+                to the configured embedding_config()
+        """
         self.api_key = settings.PINECONE_API_KEY
         self.environment = settings.PINECONE_ENV
         
         if not self.api_key or not self.environment:
             raise ValueError("Pinecone API key and environment must be set in settings")
         
-        # Initialize Pinecone
+        # Initialize Pinecone (SDK imported lazily to keep startup fast)
+        from pinecone import Pinecone
+        
         self.pc = Pinecone(api_key=self.api_key)
-        self.index_name = "axonflow-documents"
-        self.dimension = 1536  # OpenAI ada-002 embedding dimension
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._index_checked = False
+        self.index_name = index_name or settings.PINECONE_INDEX_NAME
+        # Must match the embeddings written to and queried against the index
+        self.embedding_model, self.dimension = embedding or embedding_config()
+        
+        # Upsert batching: packed by vector count and serialized request size
+        self.upsert_batch_size = settings.PINECONE_UPSERT_BATCH_SIZE
+        self.upsert_max_bytes = settings.PINECONE_UPSERT_MAX_BYTES
+        self.upsert_concurrency = settings.PINECONE_UPSERT_CONCURRENCY
+        self.upsert_max_retries = settings.PINECONE_UPSERT_MAX_RETRIES
+        
+        # ID-based deletes: the API accepts up to 1000 IDs per delete call
+        self.delete_batch_size = 1000
+        self.fetch_batch_size = 100
+        self.delete_verify_rounds = 3
+    
+    @staticmethod
+    def namespace_for_user(user_id: int) -> str:
+        """Namespace holding all vectors of one user"""
+        return f"user_{user_id}"
         
     def create_index_if_not_exists(self):
-        """Create Pinecone index if it doesn't exist"""
+        """Create Pinecone index if it doesn't exist (checked once per client)"""
+        if self._index_checked:
+            return
+        
+        from pinecone import ServerlessSpec
+        
         try:
             # Check if index exists
             existing_indexes = self.pc.list_indexes()
@@ -49,36 +144,208 @@ class PineconeClient:
                 
                 print(f"Created Pinecone index: {self.index_name}")
             else:
+                # Vectors of another dimension cannot share the index
+                index_dimension = self.pc.describe_index(self.index_name).dimension
+                if index_dimension != self.dimension:
+                    raise ValueError(
+                        f"index {self.index_name} holds {index_dimension}-dimensional vectors "
+                        f"but {self.embedding_model} is configured for {self.dimension}"
+                    )
                 print(f"Pinecone index already exists: {self.index_name}")
+            
+            self._index_checked = True
                 
         except Exception as e:
             raise Exception(f"Error creating Pinecone index: {str(e)}")
     
     def get_index(self):
-        """Get Pinecone index instance"""
+        """Get Pinecone index instance, resolved once and then reused"""
+        if self._index is not None:
+            return self._index
+        
         try:
-            return self.pc.Index(self.index_name)
+            with self._index_lock:
+                if self._index is None:
+                    self._index = self.pc.Index(self.index_name)
+            return self._index
         except Exception as e:
             raise Exception(f"Error getting Pinecone index: {str(e)}")
     
-    def upsert_vectors(self, vectors: List[Dict]):
+    @staticmethod
+    def _as_list(values) -> List[float]:
+        """Convert NumPy embeddings to plain lists, which the SDK serializes"""
+        return values.tolist() if hasattr(values, 'tolist') else values
+    
+    @staticmethod
+    def _vector_size(vector: Dict) -> int:
+        """Serialized size of a vector in bytes, as it will appear in the request body"""
+        return len(json.dumps(vector, separators=(',', ':')).encode('utf-8'))
+    
+    def iter_upsert_batches(self, vectors: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """
+        Pack vectors into upsert batches bounded by count and payload size
+        
+        Vectors carry their chunk text in metadata, so a fixed count can
+        exceed the request size limit. A batch is closed as soon as adding
+        the next vector would cross either bound. NumPy 'values' are turned
+        into lists here, so only the batches being sent exist as Python floats.
+        
+        Args:
+            vectors: Any iterable of vector dicts, consumed lazily
+            
+        Yields:
+            Lists of vector dicts ready to upsert
+        """
+        batch = []
+        batch_bytes = 0
+        
+        for vector in vectors:
+            vector = {**vector, 'values': self._as_list(vector['values'])}
+            size = self._vector_size(vector)
+            if batch and (
+                len(batch) >= self.upsert_batch_size
+                or batch_bytes + size > self.upsert_max_bytes
+            ):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            
+            batch.append(vector)
+            batch_bytes += size
+        
+        if batch:
+            yield batch
+    
+    def _guarded(self, func: Callable, block: bool = False, **kwargs):
+        """
+        Make one Pinecone request through the 'pinecone' circuit breaker
+        
+        Only outages (see _is_outage) count as failures. The outcome is
+        recorded whatever happens, so a half-open probe is always released.
+        
+        Args:
+            func: Index method to call
+            block: Wait while the circuit is open instead of raising
+                CircuitOpen (ingestion writes pause rather than fail)
+            **kwargs: Arguments for func
+        """
+        breaker = get_breaker('pinecone')
+        breaker.acquire(block=block)
+        started = time.monotonic()
+        outage = True
+        try:
+            result = func(**kwargs)
+            outage = False
+            return result
+        except Exception as e:
+            # Otherwise Pinecone answered; the request itself was rejected
+            outage = _is_outage(e)
+            raise
+        finally:
+            if outage:
+                breaker.record_failure()
+            else:
+                breaker.record_success(time.monotonic() - started)
+    
+    def _upsert_batch_with_retry(self, index, batch: List[Dict], namespace: str) -> int:
+        """Upsert one batch, retrying transient failures with jittered backoff"""
+        for attempt in range(self.upsert_max_retries + 1):
+            try:
+                self._guarded(index.upsert, block=True, vectors=batch, namespace=namespace)
+                return len(batch)
+            except Exception:
+                if attempt == self.upsert_max_retries:
+                    raise
+                time.sleep((2 ** attempt) * 0.5 + random.uniform(0, 0.5))
+    
+    def upsert_vectors(
+        self,
+        vectors: Iterable[Dict],
+        progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+        total: Optional[int] = None,
+        namespace: str = '',
+        batch_callback: Optional[Callable[[List[Dict]], None]] = None
+    ) -> int:
         """
         Upload vectors to Pinecone
         
+        Batches are packed by serialized size and sent concurrently with at
+        most `upsert_concurrency` requests in flight. `vectors` may be a
+        generator, in which case upserts start while it is still producing
+        (e.g. while later embedding batches are being generated).
+        
         Args:
-            vectors: List of dictionaries with 'id', 'values', and 'metadata'
+            vectors: Iterable of dictionaries with 'id', 'values', and 'metadata'
+            progress_callback: Optional callable receiving (vectors_done, total_vectors)
+            total: Expected vector count for progress reporting; defaults to
+                len(vectors) when vectors is a list
+            namespace: Target namespace (see namespace_for_user)
+            batch_callback: Optional callable receiving each batch once its
+                upsert is confirmed (used for ingestion checkpoints)
+            
+        Returns:
+            Number of vectors upserted
         """
+        if total is None and isinstance(vectors, list):
+            total = len(vectors)
+        
         try:
             index = self.get_index()
+            upserted = 0
             
-            # Upsert in batches of 100
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                index.upsert(vectors=batch)
+            with ThreadPoolExecutor(max_workers=self.upsert_concurrency) as executor:
+                pending = set()
+                batches = {}
+                
+                def confirm(done):
+                    # Every successful batch is confirmed, even when another
+                    # one in the same set failed; the first error is returned
+                    nonlocal upserted
+                    error = None
+                    for future in done:
+                        batch = batches.pop(future)
+                        if future.cancelled() or future.exception() is not None:
+                            error = error or (None if future.cancelled() else future.exception())
+                            continue
+                        upserted += future.result()
+                        if batch_callback:
+                            batch_callback(batch)
+                        if progress_callback:
+                            progress_callback(upserted, total)
+                    return error
+                
+                def drain(return_when):
+                    nonlocal pending
+                    done, pending = wait(pending, return_when=return_when)
+                    # Raises the batch error once its retries are exhausted
+                    error = confirm(done)
+                    if error is not None:
+                        raise error
+                
+                try:
+                    for batch in self.iter_upsert_batches(vectors):
+                        # Bound in-flight batches so a fast producer can't queue the whole document
+                        if len(pending) >= self.upsert_concurrency:
+                            drain(FIRST_COMPLETED)
+                        future = executor.submit(self._upsert_batch_with_retry, index, batch, namespace)
+                        batches[future] = batch
+                        pending.add(future)
+                    
+                    if pending:
+                        drain(ALL_COMPLETED)
+                except Exception:
+                    for future in pending:
+                        future.cancel()
+                    # Batches already in flight still finish; keep what they stored
+                    done, pending = wait(pending)
+                    confirm(done)
+                    raise
             
-            print(f"Upserted {len(vectors)} vectors to Pinecone")
+            print(f"Upserted {upserted} vectors to Pinecone")
+            return upserted
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             raise Exception(f"Error upserting vectors: {str(e)}")
     
@@ -86,67 +353,261 @@ class PineconeClient:
         self, 
         query_vector: List[float], 
         top_k: int = 5,
-        filter_dict: Optional[Dict] = None
+        filter_dict: Optional[Dict] = None,
+        namespace: str = '',
+        include_values: bool = False,
+        coalesce: bool = True
     ) -> List[Dict]:
         """
         Query Pinecone for similar vectors
         
         Args:
-            query_vector: Query embedding vector
+            query_vector: Query embedding vector (list or float32 array)
             top_k: Number of results to return
             filter_dict: Optional metadata filter
+            namespace: Namespace to search; per-user namespaces keep the
+                candidate set to the caller's own vectors
+            include_values: Also return each match's embedding under
+                'values' (needed for re-ranking)
+            coalesce: Share an identical in-flight query; False forces a
+                separate one (used for hedged requests)
             
         Returns:
             List of matching results with metadata
         """
+        if not coalesce:
+            return self._query_vectors(query_vector, top_k, filter_dict, namespace, include_values)
+        key = self._query_key(query_vector, top_k, filter_dict, namespace, include_values)
+        return list(query_flights.do(
+            key,
+            lambda: self._query_vectors(query_vector, top_k, filter_dict, namespace, include_values)
+        ))
+    
+    async def aquery_vectors(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter_dict: Optional[Dict] = None,
+        namespace: str = '',
+        include_values: bool = False
+    ) -> List[Dict]:
+        """Async variant of query_vectors, coalesced with sync callers too"""
+        key = self._query_key(query_vector, top_k, filter_dict, namespace, include_values)
+        return list(await query_flights.do_async(
+            key,
+            lambda: asyncio.to_thread(
+                self._query_vectors, query_vector, top_k, filter_dict, namespace, include_values
+            )
+        ))
+    
+    def _query_key(self, query_vector, top_k, filter_dict, namespace, include_values):
+        """Coalescing key: identical vector, filter and options against the same index"""
+        return (
+            self.index_name,
+            namespace,
+            top_k,
+            include_values,
+            fingerprint_vector(query_vector),
+            json.dumps(filter_dict, sort_keys=True) if filter_dict else None,
+        )
+    
+    def _query_vectors(self, query_vector, top_k, filter_dict, namespace, include_values) -> List[Dict]:
+        """Run one query against the index"""
         try:
             index = self.get_index()
             
             # Query index
-            results = index.query(
-                vector=query_vector,
+            results = self._guarded(
+                index.query,
+                vector=self._as_list(query_vector),
                 top_k=top_k,
                 include_metadata=True,
-                filter=filter_dict
+                include_values=include_values,
+                filter=filter_dict,
+                namespace=namespace
             )
             
             # Format results
             matches = []
             for match in results.matches:
-                matches.append({
+                result = {
                     'id': match.id,
                     'score': match.score,
                     'metadata': match.metadata
-                })
+                }
+                if include_values:
+                    result['values'] = match.values
+                matches.append(result)
             
             return matches
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             raise Exception(f"Error querying vectors: {str(e)}")
     
-    def delete_by_document_id(self, document_id: int):
+    def fetch_vectors(self, ids: List[str], namespace: str = '') -> Dict:
+        """
+        Fetch stored vectors by ID
+        
+        Args:
+            ids: Vector IDs to fetch
+            namespace: Namespace to read from
+            
+        Returns:
+            Mapping of vector ID to dict with 'id', 'values', and 'metadata'
+        """
+        try:
+            index = self.get_index()
+            vectors = {}
+            
+            # IDs travel in the query string, so keep fetch batches small
+            for i in range(0, len(ids), self.fetch_batch_size):
+                response = index.fetch(ids=ids[i:i + self.fetch_batch_size], namespace=namespace)
+                for vector_id, vector in response.vectors.items():
+                    vectors[vector_id] = {
+                        'id': vector_id,
+                        'values': list(vector.values),
+                        'metadata': dict(vector.metadata or {}),
+                    }
+            
+            return vectors
+            
+        except Exception as e:
+            raise Exception(f"Error fetching vectors: {str(e)}")
+    
+    def list_ids(self, prefix: str, namespace: str = '') -> List[str]:
+        """
+        List vector IDs starting with `prefix` (serverless indexes only)
+        
+        Args:
+            prefix: ID prefix, e.g. "doc_12_chunk_"
+            namespace: Namespace to list
+            
+        Returns:
+            Matching vector IDs
+        """
+        try:
+            index = self.get_index()
+            ids = []
+            for page in index.list(prefix=prefix, namespace=namespace):
+                ids.extend(page)
+            return ids
+        except Exception as e:
+            raise Exception(f"Error listing vectors: {str(e)}")
+    
+    def fetch_existing_ids(self, ids: List[str], namespace: str = '') -> List[str]:
+        """
+        Return the subset of `ids` that is still present in the index
+        
+        Args:
+            ids: Vector IDs to look up
+            namespace: Namespace to look in
+            
+        Returns:
+            IDs that exist in the index
+        """
+        try:
+            index = self.get_index()
+            existing = []
+            
+            # IDs travel in the query string, so keep fetch batches small
+            for i in range(0, len(ids), self.fetch_batch_size):
+                batch = ids[i:i + self.fetch_batch_size]
+                response = self._guarded(index.fetch, ids=batch, namespace=namespace)
+                existing.extend(response.vectors.keys())
+            
+            return existing
+            
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            raise Exception(f"Error fetching vectors: {str(e)}")
+    
+    def delete_by_ids(self, ids: List[str], verify: bool = True, namespace: str = '') -> int:
+        """
+        Delete vectors by exact ID, in batches, with an optional verification pass
+        
+        After deleting, the IDs are fetched back and any survivors are
+        deleted again, up to `delete_verify_rounds` times.
+        
+        Args:
+            ids: Vector IDs to delete
+            verify: Whether to confirm the IDs are gone afterwards
+            namespace: Namespace holding the vectors
+            
+        Returns:
+            Number of IDs requested for deletion
+        """
+        try:
+            index = self.get_index()
+            remaining = list(ids)
+            
+            for _ in range(self.delete_verify_rounds if verify else 1):
+                for i in range(0, len(remaining), self.delete_batch_size):
+                    self._guarded(
+                        index.delete,
+                        ids=remaining[i:i + self.delete_batch_size],
+                        namespace=namespace
+                    )
+                
+                if not verify:
+                    break
+                
+                remaining = self.fetch_existing_ids(remaining, namespace=namespace)
+                if not remaining:
+                    break
+            
+            if verify and remaining:
+                raise Exception(f"{len(remaining)} vectors still present after deletion")
+            
+            return len(ids)
+            
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            raise Exception(f"Error deleting vectors: {str(e)}")
+    
+    def delete_by_document_id(
+        self,
+        document_id: int,
+        vector_ids: Optional[List[str]] = None,
+        namespace: str = ''
+    ):
         """
         Delete all vectors for a specific document
         
         Args:
             document_id: Document ID to delete
+            vector_ids: IDs from the document's vector manifest. When given,
+                deletion is by ID with verification; otherwise falls back to
+                a metadata-filter delete (documents ingested before manifests)
+            namespace: Namespace holding the document's vectors
         """
+        if vector_ids is not None:
+            self.delete_by_ids(vector_ids, namespace=namespace)
+            print(f"Deleted {len(vector_ids)} vectors for document_id: {document_id}")
+            return
+        
         try:
             index = self.get_index()
             
             # Delete by metadata filter
             index.delete(
-                filter={"document_id": {"$eq": document_id}}
+                filter={"document_id": {"$eq": document_id}},
+                namespace=namespace
             )
             
             print(f"Deleted vectors for document_id: {document_id}")
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             raise Exception(f"Error deleting vectors: {str(e)}")
     
     def delete_by_user_id(self, user_id: int):
         """
-        Delete all vectors for a specific user
+        Delete all vectors for a specific user by dropping their namespace
         
         Args:
             user_id: User ID to delete
@@ -154,9 +615,9 @@ class PineconeClient:
         try:
             index = self.get_index()
             
-            # Delete by metadata filter
             index.delete(
-                filter={"user_id": {"$eq": user_id}}
+                delete_all=True,
+                namespace=self.namespace_for_user(user_id)
             )
             
             print(f"Deleted vectors for user_id: {user_id}")
@@ -164,6 +625,24 @@ class PineconeClient:
         except Exception as e:
             raise Exception(f"Error deleting vectors: {str(e)}")
     
+    def delete_index(self):
+        """Delete the whole index (used to drop retired or abandoned rebuilds)"""
+        try:
+            self.pc.delete_index(self.index_name)
+            self._index = None
+            self._index_checked = False
+            print(f"Deleted Pinecone index: {self.index_name}")
+        except Exception as e:
+            raise Exception(f"Error deleting Pinecone index: {str(e)}")
+    
+    def namespace_counts(self) -> Dict[str, int]:
+        """Vector count per namespace, from the index statistics"""
+        stats = self.get_stats()
+        return {
+            namespace: summary.vector_count
+            for namespace, summary in (stats.namespaces or {}).items()
+        }
+    
     def get_stats(self) -> Dict:
         """Get index statistics"""
         try:
@@ -0,0 +1,221 @@
+"""
+Rate Limiter for AxonFlow AI
+Shares OpenAI request and token budgets across threads, processes and hosts
+"""
+
+from typing import Optional
+from django.conf import settings
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes: interactive calls (chat) may drain the whole budget, bulk
+# calls (ingestion) stop at a reserve that is kept free for interactive ones
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BULK = 'bulk'
+
+
+class InMemoryRateLimiter:
+    """
+    Token-bucket limiter for a single process
+
+    Two buckets refill continuously: one counting requests, one counting
+    tokens. Bulk callers additionally yield to any waiting interactive caller.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, bulk_reserve: float):
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0
+        self.bulk_reserve = bulk_reserve
+
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = time.monotonic()
+        self._interactive_waiting = 0
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.request_capacity, self._requests + elapsed * self.request_rate)
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_rate)
+
+    def _try_take(self, tokens: int, priority: str) -> float:
+        """Take budget if available; otherwise return seconds until it should be"""
+        self._refill()
+        reserve = self.bulk_reserve if priority == PRIORITY_BULK else 0.0
+        tokens = min(tokens, self.token_capacity * (1 - reserve))
+
+        request_short = (1 + self.request_capacity * reserve) - self._requests
+        token_short = (tokens + self.token_capacity * reserve) - self._tokens
+
+        if request_short <= 0 and token_short <= 0:
+            self._requests -= 1
+            self._tokens -= tokens
+            return 0.0
+
+        return max(request_short / self.request_rate, token_short / self.token_rate, 0.01)
+
+    def acquire(self, tokens: int, priority: str = PRIORITY_INTERACTIVE, timeout: Optional[float] = None):
+        """
+        Block until one request and `tokens` tokens of budget are available
+
+        Args:
+            tokens: Estimated tokens the call will consume
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BULK
+            timeout: Maximum seconds to wait
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interactive = priority != PRIORITY_BULK
+
+        with self._condition:
+            if interactive:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    if interactive or not self._interactive_waiting:
+                        wait_for = self._try_take(tokens, priority)
+                        if not wait_for:
+                            return
+                    else:
+                        wait_for = 0.05
+
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise Exception(f"Rate limiter timed out waiting for {tokens} tokens")
+                        wait_for = min(wait_for, remaining)
+
+                    self._condition.wait(wait_for)
+            finally:
+                if interactive:
+                    self._interactive_waiting -= 1
+                    self._condition.notify_all()
+
+
+class RedisRateLimiter:
+    """
+    Token-bucket limiter shared by every process that uses the same Redis
+
+    The refill-and-take step runs as one Lua script, so concurrent workers on
+    different hosts never overdraw the budget. Redis' own clock is used so
+    host clock skew does not matter.
+    """
+
+    SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local req_cap, req_rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local tok_cap, tok_rate = tonumber(ARGV[3]), tonumber(ARGV[4])
+    local cost, reserve = tonumber(ARGV[5]), tonumber(ARGV[6])
+
+    local function level(key, capacity, rate)
+        local data = redis.call('HMGET', key, 'level', 'ts')
+        local value = tonumber(data[1]) or capacity
+        local ts = tonumber(data[2]) or now
+        return math.min(capacity, value + (now - ts) * rate)
+    end
+
+    local req = level(KEYS[1], req_cap, req_rate)
+    local tok = level(KEYS[2], tok_cap, tok_rate)
+    cost = math.min(cost, tok_cap * (1 - reserve))
+    local req_short = (1 + req_cap * reserve) - req
+    local tok_short = (cost + tok_cap * reserve) - tok
+    local wait = 0
+
+    if req_short <= 0 and tok_short <= 0 then
+        req = req - 1
+        tok = tok - cost
+    else
+        wait = math.max(req_short / req_rate, tok_short / tok_rate, 0.01)
+    end
+
+    redis.call('HSET', KEYS[1], 'level', req, 'ts', now)
+    redis.call('HSET', KEYS[2], 'level', tok, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], 120)
+    redis.call('EXPIRE', KEYS[2], 120)
+    return tostring(wait)
+    """
+
+    def __init__(self, redis_client, requests_per_minute: int, tokens_per_minute: int,
+                 bulk_reserve: float, key_prefix: str = 'axonflow:openai'):
+        self.redis = redis_client
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.bulk_reserve = bulk_reserve
+        self.keys = [f"{key_prefix}:requests", f"{key_prefix}:tokens"]
+        self._script = redis_client.register_script(self.SCRIPT)
+
+    def acquire(self, tokens: int, priority: str = PRIORITY_INTERACTIVE, timeout: Optional[float] = None):
+        """
+        Block until one request and `tokens` tokens of budget are available
+
+        Args:
+            tokens: Estimated tokens the call will consume
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BULK
+            timeout: Maximum seconds to wait
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        reserve = self.bulk_reserve if priority == PRIORITY_BULK else 0.0
+
+        while True:
+            wait_for = float(self._script(keys=self.keys, args=[
+                self.requests_per_minute, self.requests_per_minute / 60.0,
+                self.tokens_per_minute, self.tokens_per_minute / 60.0,
+                tokens, reserve,
+            ]))
+            if not wait_for:
+                return
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception(f"Rate limiter timed out waiting for {tokens} tokens")
+                wait_for = min(wait_for, remaining)
+
+            time.sleep(wait_for)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Process-wide OpenAI rate limiter
+
+    Uses Redis when OPENAI_RATE_LIMIT_REDIS_URL is set and reachable, so all
+    workers on all hosts share one budget; otherwise falls back to an
+    in-memory limiter for this process.
+    """
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = _build_rate_limiter()
+    return _limiter
+
+
+def _build_rate_limiter():
+    requests_per_minute = settings.OPENAI_REQUESTS_PER_MINUTE
+    tokens_per_minute = settings.OPENAI_TOKENS_PER_MINUTE
+    bulk_reserve = settings.OPENAI_BULK_RESERVE
+    redis_url = settings.OPENAI_RATE_LIMIT_REDIS_URL
+
+    if redis_url:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(redis_url)
+            client.ping()
+            return RedisRateLimiter(client, requests_per_minute, tokens_per_minute, bulk_reserve)
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using in-memory fallback: {str(e)}")
+
+    return InMemoryRateLimiter(requests_per_minute, tokens_per_minute, bulk_reserve)
@@ -0,0 +1,195 @@
+"""
+Vector Reconciliation for AxonFlow AI
+Find vectors without a document (and documents without their vectors) in the active index
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Document, IngestionCheckpoint, ReconciliationRun
+from .pinecone_client import PineconeClient
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# IDs written under Document.VECTOR_ID_SCHEME
+VECTOR_ID_PATTERN = re.compile(r'^doc_(\d+)_chunk_(\d+)$')
+
+
+def next_namespaces(index_name: str, namespaces: List[str], limit: int = 0) -> List[str]:
+    """
+    The slice of namespaces the next run should check
+
+    Continues after the last namespace reached by the previous (non dry-run)
+    run on the same index, wrapping around at the end.
+
+    Args:
+        index_name: Index being reconciled
+        namespaces: All namespaces, sorted
+        limit: Maximum namespaces to return (0 = all)
+    """
+    previous = (
+        ReconciliationRun.objects.filter(index_name=index_name, dry_run=False)
+        .order_by('-started_at')
+        .first()
+    )
+    start = 0
+    if previous is not None and previous.last_namespace:
+        start = next((i for i, ns in enumerate(namespaces) if ns > previous.last_namespace), 0)
+
+    ordered = namespaces[start:] + namespaces[:start]
+    return ordered[:limit] if limit else ordered
+
+
+def reconcile_namespace(
+    client: PineconeClient,
+    namespace: str,
+    index_count: int,
+    full: bool = False,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Compare one namespace's vector IDs with the Document manifests
+
+    Orphans are vectors whose document no longer exists, all vectors of a
+    failed document with no checkpoint left to resume from (partial upserts
+    that would otherwise stay searchable), vectors of a completed or failed
+    document beyond its manifest (leftovers of an earlier, longer run) and
+    copies left in a namespace the document has since moved out of. Vectors
+    of documents in flight or paused, and those within the manifest of a
+    failed document that can still resume, are never touched. Completed
+    documents with vectors missing from the index are reported for
+    re-queueing.
+
+    Unless `full`, a namespace whose stats count equals the manifests' total
+    and holds no unfinished documents is taken as consistent without
+    listing its IDs.
+
+    Args:
+        client: Client for the active index
+        namespace: Namespace to check
+        index_count: Vector count the index stats report for it
+        full: Always list IDs, even if the counts agree
+        dry_run: Report without deleting
+
+    Returns:
+        {'vectors', 'expected', 'listed', 'orphans', 'orphan_documents',
+         'failed_documents', 'unrecognized', 'deleted', 'missing_documents'}
+    """
+    documents = Document.objects.filter(vector_namespace=namespace)
+    completed = documents.filter(processing_status=Document.Status.COMPLETED).exclude(vector_id_scheme='')
+    expected = completed.aggregate(total=Sum('vector_count'))['total'] or 0
+
+    report = {
+        'vectors': index_count,
+        'expected': expected,
+        'listed': False,
+        'orphans': 0,
+        'orphan_documents': [],
+        'failed_documents': [],
+        'unrecognized': 0,
+        'deleted': 0,
+        'missing_documents': [],
+    }
+
+    unfinished = documents.exclude(processing_status=Document.Status.COMPLETED).exists()
+    if not full and not unfinished and index_count == expected:
+        return report
+
+    # List before reading the manifests: any listed vector was written
+    # before the snapshot below, so its document row already existed
+    listed = defaultdict(dict)
+    for vector_id in client.list_ids(prefix='doc_', namespace=namespace):
+        match = VECTOR_ID_PATTERN.match(vector_id)
+        if match is None:
+            report['unrecognized'] += 1
+            continue
+        listed[int(match.group(1))][int(match.group(2))] = vector_id
+    report['listed'] = True
+
+    rows = {
+        document.id: document
+        for document in Document.objects.filter(id__in=list(listed)).only(
+            'id', 'processing_status', 'vector_count', 'vector_id_scheme', 'vector_namespace'
+        )
+    }
+
+    failed = [
+        document_id for document_id, document in rows.items()
+        if document.processing_status == Document.Status.FAILED
+    ]
+    resumable = set(
+        IngestionCheckpoint.objects.filter(document_id__in=failed).values_list('document_id', flat=True)
+    )
+
+    orphan_ids = []
+    abandoned = {}
+    for document_id, chunks in listed.items():
+        document = rows.get(document_id)
+        if document is None:
+            orphan_ids.extend(chunks.values())
+            report['orphan_documents'].append(document_id)
+            continue
+        if document.vector_id_scheme != Document.VECTOR_ID_SCHEME:
+            continue
+        if document.processing_status == Document.Status.FAILED and document_id not in resumable:
+            abandoned[document_id] = list(chunks.values())
+            continue
+        if document.processing_status not in (Document.Status.COMPLETED, Document.Status.FAILED):
+            continue
+        if document.vector_namespace != namespace:
+            orphan_ids.extend(chunks.values())
+            continue
+        orphan_ids.extend(vector_id for index, vector_id in chunks.items() if index >= document.vector_count)
+
+    for document in completed.filter(vector_count__gt=0).only('id', 'vector_count'):
+        present = listed.get(document.id, {})
+        if any(index not in present for index in range(document.vector_count)):
+            report['missing_documents'].append(document.id)
+
+    if abandoned:
+        # A retry may have started since the snapshot; it owns the vectors then
+        still_abandoned = (
+            Document.objects.filter(id__in=list(abandoned), processing_status=Document.Status.FAILED)
+            .exclude(id__in=IngestionCheckpoint.objects.values('document_id'))
+            .values_list('id', flat=True)
+        )
+        for document_id in still_abandoned:
+            orphan_ids.extend(abandoned[document_id])
+            report['failed_documents'].append(document_id)
+
+    report['orphans'] = len(orphan_ids)
+    if orphan_ids and not dry_run:
+        client.delete_by_ids(orphan_ids, namespace=namespace)
+        report['deleted'] = len(orphan_ids)
+        logger.info(f"Deleted {len(orphan_ids)} orphaned vectors from namespace {namespace or '(default)'}")
+
+    return report
+
+
+def requeue_documents(document_ids: List[int], reason: Optional[str] = None) -> List[int]:
+    """
+    Mark completed documents whose vectors went missing for reprocessing
+
+    Only documents still COMPLETED are re-queued, so a document that began
+    processing meanwhile is left alone.
+
+    Args:
+        document_ids: Documents to re-queue
+        reason: Message shown on the document while it waits
+
+    Returns:
+        IDs that were re-queued
+    """
+    requeued = list(
+        Document.objects.filter(id__in=document_ids, processing_status=Document.Status.COMPLETED)
+        .values_list('id', flat=True)
+    )
+    Document.objects.filter(id__in=requeued, processing_status=Document.Status.COMPLETED).update(
+        processing_status=Document.Status.PENDING,
+        error_message=reason or "Re-queued: vectors missing from the index",
+        progress_updated_at=timezone.now(),
+    )
+    return requeued
@@ -0,0 +1,166 @@
+"""
+Retrieval helpers for AxonFlow AI
+Builds query variants, fuses and re-ranks vector search results before
+they are used as RAG context
+"""
+
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import re
+
+
+def mmr_select(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.7
+) -> List[int]:
+    """
+    Pick a relevant but diverse subset using Maximal Marginal Relevance
+    
+    Each step picks the candidate maximizing
+    lambda * sim(query, c) - (1 - lambda) * max(sim(c, already selected)),
+    with all similarities computed up front as a single matrix product.
+    
+    Args:
+        query_vector: Query embedding
+        candidate_vectors: Candidate embeddings, one per row
+        k: Number of candidates to select
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity
+        
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    if len(candidate_vectors) == 0 or k <= 0:
+        return []
+    
+    query = np.asarray(query_vector, dtype=np.float32)
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    
+    # Normalize so dot products are cosine similarities
+    query = query / (np.linalg.norm(query) or 1.0)
+    norms = np.linalg.norm(candidates, axis=1, keepdims=True)
+    candidates = candidates / np.where(norms == 0, 1.0, norms)
+    
+    query_similarity = candidates @ query
+    pairwise_similarity = candidates @ candidates.T
+    
+    k = min(k, len(candidates))
+    first = int(np.argmax(query_similarity))
+    selected = [first]
+    max_similarity_to_selected = pairwise_similarity[first].copy()
+    
+    while len(selected) < k:
+        scores = lambda_mult * query_similarity - (1 - lambda_mult) * max_similarity_to_selected
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity_to_selected, pairwise_similarity[best], out=max_similarity_to_selected)
+    
+    return selected
+
+
+def rerank_mmr(
+    query_vector: Sequence[float],
+    matches: List[Dict],
+    k: int,
+    lambda_mult: float = 0.7
+) -> List[Dict]:
+    """
+    Diversify query_vectors results with MMR
+    
+    Args:
+        query_vector: Query embedding used for the search
+        matches: Results from PineconeClient.query_vectors(include_values=True)
+        k: Number of matches to keep
+        lambda_mult: Relevance/diversity trade-off (see mmr_select)
+        
+    Returns:
+        Up to k matches, most relevant first, near-duplicates suppressed
+    """
+    if len(matches) <= 1 or any(match.get('values') is None or len(match['values']) == 0 for match in matches):
+        return matches[:k]
+    
+    selected = mmr_select(
+        query_vector,
+        [match['values'] for match in matches],
+        k=k,
+        lambda_mult=lambda_mult
+    )
+    return [matches[i] for i in selected]
+
+
+# Splits "What is X and how does Y work" before the second question word
+_CONJOINED_QUESTION = re.compile(
+    r',?\s+(?:and|also|plus)\s+(?=(?:what|how|why|when|where|which|who|whose|is|are|does|do|did|can|should)\b)',
+    re.IGNORECASE
+)
+
+
+def query_variants(message: str, history: Optional[List[Dict[str, str]]] = None, limit: int = 4) -> List[str]:
+    """
+    Search queries for one chat message
+    
+    Built without a model call so they cost no extra round trip: the raw
+    message; a history-aware rewrite that prefixes the previous exchange, so
+    follow-ups like "what about the second one?" carry their subject; and
+    the sub-questions of a compound question.
+    
+    Args:
+        message: The user's message
+        history: Earlier turns as {'role', 'content'}, oldest first
+        limit: Maximum number of variants, the raw message included
+        
+    Returns:
+        Distinct variants, the raw message first
+    """
+    variants = [message]
+    
+    if history:
+        previous_user = next((turn['content'] for turn in reversed(history) if turn['role'] == 'user'), '')
+        previous_answer = next((turn['content'] for turn in reversed(history) if turn['role'] == 'assistant'), '')
+        context = ' '.join(part for part in (previous_user, previous_answer[:500]) if part)
+        if context:
+            variants.append(f"{context}\n{message}")
+    
+    parts = [part.strip() for part in re.split(r'(?<=\?)\s+|;\s*', message) if part.strip()]
+    if len(parts) == 1:
+        parts = [part.strip() for part in _CONJOINED_QUESTION.split(message) if part.strip()]
+    if len(parts) > 1:
+        variants.extend(part for part in parts if len(part.split()) >= 3)
+    
+    distinct = []
+    for variant in variants:
+        if variant not in distinct:
+            distinct.append(variant)
+    return distinct[:limit]
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], k: int = 60, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Merge ranked match lists with Reciprocal Rank Fusion
+    
+    Each match scores sum(1 / (k + rank)) over the lists it appears in, so
+    chunks found by several query variants rise to the top without having
+    to compare similarity scores across queries. A match keeps its best
+    similarity under 'score'.
+    
+    Args:
+        result_lists: query_vectors results, one list per query
+        k: Damping constant; larger values flatten the rank weights
+        limit: Maximum number of fused matches to return
+        
+    Returns:
+        Distinct matches, best fused rank first
+    """
+    fused = {}
+    scores = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            scores[match['id']] = scores.get(match['id'], 0.0) + 1.0 / (k + rank)
+            best = fused.get(match['id'])
+            if best is None or match['score'] > best['score']:
+                fused[match['id']] = match
+    
+    ranked = sorted(fused.values(), key=lambda match: scores[match['id']], reverse=True)
+    return ranked[:limit] if limit else ranked
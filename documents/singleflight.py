@@ -0,0 +1,103 @@
+"""
+Single-flight request coalescing for AxonFlow AI
+Concurrent identical calls share one upstream call and its result
+"""
+
+from array import array
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Sequence
+import asyncio
+import hashlib
+import threading
+
+
+def fingerprint_vector(vector: Sequence[float]) -> str:
+    """Stable hash of a vector's float32 representation, usable as a coalescing key"""
+    if hasattr(vector, 'astype'):
+        data = vector.astype('float32', copy=False).tobytes()
+    else:
+        data = array('f', vector).tobytes()
+    return hashlib.sha1(data).hexdigest()
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for the leader's result instead of making
+    their own. Threads and coroutines share the same in-flight table, so a
+    sync leader can serve async followers and vice versa. Nothing is cached:
+    once the call finishes, the next caller starts a fresh one.
+
+    Followers receive the same result object as the leader and must treat
+    it as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def _join(self, key: Hashable):
+        """Return (future, is_leader) for key"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Run func once for all concurrent callers with the same key
+
+        Args:
+            key: Identity of the call (e.g. model plus input text)
+            func: Zero-argument callable performing the upstream call
+
+        Returns:
+            The result of func, shared by every coalesced caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of do()
+
+        Args:
+            key: Identity of the call
+            func: Zero-argument callable returning an awaitable
+
+        Returns:
+            The awaited result of func, shared by every coalesced caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await func()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
@@ -0,0 +1,283 @@
+"""
+Document Summaries for AxonFlow AI
+Hierarchical summary trees (chunk groups -> sections -> document) and overview-question routing
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from .models import Document, DocumentSummary
+import contextvars
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Questions about a document as a whole rather than a detail in it: the
+# overview phrase has to open the question, so "what does the executive
+# summary say about revenue?" still goes through retrieval
+OVERVIEW_QUERY = re.compile(
+    r"^(please\s+)?((can|could|would) you\s+)?(please\s+)?("
+    r"summari[sz]e|tl;?dr|"
+    r"(give|provide|write|show)( me| us)? (an? |the )?((short|brief|quick|high[- ]level|overall) )?"
+    r"(summary|summaries|overview|gist|rundown)|"
+    r"what('s| is| are) (the )?(summary|summaries|overview|gist|"
+    r"main (points?|ideas?|themes?|takeaways?|arguments?|findings?)|key (points|takeaways|findings|ideas))|"
+    r"(main|key) (points|ideas|themes|takeaways|findings)|"
+    r"what (is|are) (this|these|the|my|that) (document|doc|paper|file|pdf|report)s? about"
+    r")\b",
+    re.IGNORECASE
+)
+
+# What narrows an overview phrase down to a detail ("... about revenue",
+# "... in section 3"), which stored summaries cannot answer reliably
+FOCUSED_QUERY = re.compile(
+    r"\b(about|regarding|concerning|related to|relating to|says?|mentions?|"
+    r"(section|chapter|page|paragraph|table|figure)s?)\b",
+    re.IGNORECASE
+)
+
+# Overview requests that need nothing beyond the stored document summary
+BARE_OVERVIEW_QUERY = re.compile(
+    r"^(please\s+)?(can you\s+|could you\s+)?"
+    r"(summari[sz]e|give (me )?an? (short |brief |quick )?(summary|overview)( of)?|tl;?dr|"
+    r"what is (this|it)( (document|doc|paper|file|pdf|report))? about)"
+    r"(\s+(this|the|my|that))?(\s+(document|doc|paper|file|pdf|report))?(\s+please)?[\s.?!]*$",
+    re.IGNORECASE
+)
+
+LEVEL_INSTRUCTIONS = {
+    DocumentSummary.Level.CHUNK_GROUP: (
+        "Summarize this passage of a document in a short paragraph. "
+        "Keep names, numbers and conclusions; do not add anything that is not in the text."
+    ),
+    DocumentSummary.Level.SECTION: (
+        "These are summaries of consecutive passages of one document. "
+        "Combine them into one paragraph describing this section."
+    ),
+    DocumentSummary.Level.DOCUMENT: (
+        "These are summaries of the sections of one document, in order. "
+        "Write an overview of the whole document: its purpose, main points and conclusions."
+    ),
+}
+
+LEVEL_MAX_TOKENS = {
+    DocumentSummary.Level.CHUNK_GROUP: 200,
+    DocumentSummary.Level.SECTION: 300,
+    DocumentSummary.Level.DOCUMENT: 500,
+}
+
+
+def is_overview_query(message: str) -> bool:
+    """Whether the message asks about whole documents, not a detail in them"""
+    message = ' '.join(message.split())
+    match = OVERVIEW_QUERY.match(message)
+    return match is not None and not FOCUSED_QUERY.search(message[match.end():])
+
+
+def is_bare_overview_query(message: str, titles: List[str]) -> bool:
+    """Whether the message only asks for a summary (of the named document)"""
+    for title in titles:
+        message = re.sub(re.escape(title), '', message, flags=re.IGNORECASE)
+    message = re.sub(r'\s+(of|for)\s*([.?!]*)$', r'\2', ' '.join(message.split()))
+    return bool(BARE_OVERVIEW_QUERY.match(message))
+
+
+def _summarize(openai_client, level: str, texts: List[str]) -> str:
+    messages = [
+        {"role": "system", "content": f"You are AxonFlow AI's document summarizer. {LEVEL_INSTRUCTIONS[level]}"},
+        {"role": "user", "content": "\n\n".join(texts)},
+    ]
+    return openai_client.chat_completion(
+        messages=messages,
+        temperature=0.3,
+        max_tokens=LEVEL_MAX_TOKENS[level]
+    ).strip()
+
+
+def _summarize_level(openai_client, level: str, items: List[Dict], group_size: int) -> List[Dict]:
+    """
+    Summarize consecutive runs of `group_size` items into the next level
+
+    Runs are summarized concurrently; each call runs in a copy of the
+    caller's context so usage stays attributed to the document.
+    """
+    groups = [items[i:i + group_size] for i in range(0, len(items), group_size)]
+
+    def summarize(group):
+        return {
+            'text': _summarize(openai_client, level, [item['text'] for item in group]),
+            'page_start': group[0].get('page_start'),
+            'page_end': group[-1].get('page_end'),
+        }
+
+    with ThreadPoolExecutor(max_workers=settings.SUMMARY_CONCURRENCY) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, summarize, group) for group in groups]
+        return [future.result() for future in futures]
+
+
+def _copy_summaries(document: Document) -> bool:
+    """Reuse the summary tree of an identical upload, if one exists"""
+    if not document.content_hash:
+        return False
+
+    source = (
+        Document.objects.filter(
+            content_hash=document.content_hash,
+            summaries__level=DocumentSummary.Level.DOCUMENT
+        )
+        .exclude(id=document.id)
+        .first()
+    )
+    if source is None:
+        return False
+
+    with transaction.atomic():
+        document.summaries.all().delete()
+        DocumentSummary.objects.bulk_create([
+            DocumentSummary(
+                document=document,
+                level=node.level,
+                position=node.position,
+                page_start=node.page_start,
+                page_end=node.page_end,
+                text=node.text,
+            )
+            for node in source.summaries.all()
+        ])
+    return True
+
+
+def build_summaries(document: Document, chunks: List[Dict], openai_client) -> int:
+    """
+    Build and store a document's summary tree
+
+    Consecutive chunks are summarized in groups of SUMMARY_GROUP_SIZE, the
+    group summaries in sections of SUMMARY_SECTION_SIZE (repeatedly, until
+    few enough remain for one call), and the sections into the document
+    summary. A document that already has a complete tree is left alone, so
+    resumed or re-queued ingestions do not pay for it twice.
+
+    Args:
+        document: Processed document
+        chunks: Its chunks, in order
+        openai_client: Client for the bulk lane
+
+    Returns:
+        Number of summary nodes stored (0 if the tree already existed)
+    """
+    if document.summaries.filter(level=DocumentSummary.Level.DOCUMENT).exists():
+        return 0
+    if _copy_summaries(document):
+        logger.info(f"Reused summaries of identical content for document {document.id}")
+        return document.summaries.count()
+    if not chunks:
+        return 0
+
+    groups = _summarize_level(openai_client, DocumentSummary.Level.CHUNK_GROUP, chunks, settings.SUMMARY_GROUP_SIZE)
+
+    # Sections of one would never shrink the level below
+    section_size = max(settings.SUMMARY_SECTION_SIZE, 2)
+    sections = []
+    if len(groups) > 1:
+        sections = _summarize_level(openai_client, DocumentSummary.Level.SECTION, groups, section_size)
+        while len(sections) > section_size:
+            sections = _summarize_level(openai_client, DocumentSummary.Level.SECTION, sections, section_size)
+
+    top = sections or groups
+    overview = {
+        'text': _summarize(openai_client, DocumentSummary.Level.DOCUMENT, [node['text'] for node in top]),
+        'page_start': top[0].get('page_start'),
+        'page_end': top[-1].get('page_end'),
+    }
+
+    nodes = [
+        DocumentSummary(document=document, level=level, position=position, **node)
+        for level, level_nodes in (
+            (DocumentSummary.Level.CHUNK_GROUP, groups),
+            (DocumentSummary.Level.SECTION, sections),
+            (DocumentSummary.Level.DOCUMENT, [overview]),
+        )
+        for position, node in enumerate(level_nodes)
+    ]
+    with transaction.atomic():
+        document.summaries.all().delete()
+        DocumentSummary.objects.bulk_create(nodes)
+
+    logger.info(f"Stored {len(nodes)} summary nodes for document {document.id}")
+    return len(nodes)
+
+
+def overview_documents(user_id: int, message: str, document_ids: Optional[List[int]] = None) -> List[Document]:
+    """
+    Documents an overview question is about, if that can be told
+
+    Documents named by title win; otherwise the session's pinned documents,
+    or the user's only document, or (for questions about "all"/"my
+    documents") up to SUMMARY_OVERVIEW_MAX_DOCUMENTS recent ones. Returns
+    an empty list when the target is unclear or a target has no summary
+    yet, so the caller falls back to regular retrieval.
+    """
+    documents = Document.objects.filter(user_id=user_id, processing_status=Document.Status.COMPLETED)
+    if document_ids:
+        documents = documents.filter(id__in=document_ids)
+    documents = list(documents.order_by('-uploaded_at'))
+
+    lowered = message.lower()
+    targets = [document for document in documents if document.title.lower() in lowered]
+    if not targets:
+        if document_ids or len(documents) == 1:
+            targets = documents
+        elif re.search(r'\b(all|my|these|each|every)\b.*\b(documents|docs|files|papers|pdfs|reports)\b', lowered):
+            targets = documents[:settings.SUMMARY_OVERVIEW_MAX_DOCUMENTS]
+
+    if not targets or len(targets) > settings.SUMMARY_OVERVIEW_MAX_DOCUMENTS:
+        return []
+
+    summarized = set(
+        DocumentSummary.objects.filter(
+            document__in=targets,
+            level=DocumentSummary.Level.DOCUMENT
+        ).values_list('document_id', flat=True)
+    )
+    if any(document.id not in summarized for document in targets):
+        return []
+    return targets
+
+
+def summary_context(documents: List[Document]) -> List[Dict]:
+    """
+    Summary nodes to answer an overview question from
+
+    The document summary of each document, plus the section summaries
+    (or group summaries for short documents) when there is only one.
+
+    Returns:
+        Nodes as {'document', 'level', 'text', 'page_start', 'page_end'}
+    """
+    levels = [DocumentSummary.Level.DOCUMENT]
+    if len(documents) == 1:
+        levels += [DocumentSummary.Level.SECTION, DocumentSummary.Level.CHUNK_GROUP]
+
+    nodes = DocumentSummary.objects.filter(document__in=documents, level__in=levels).select_related('document')
+    by_document = {}
+    for node in nodes:
+        by_document.setdefault(node.document_id, []).append(node)
+
+    context = []
+    for document in documents:
+        document_nodes = by_document.get(document.id, [])
+        overview = [node for node in document_nodes if node.level == DocumentSummary.Level.DOCUMENT]
+        detail = [node for node in document_nodes if node.level == DocumentSummary.Level.SECTION]
+        if not detail:
+            detail = [node for node in document_nodes if node.level == DocumentSummary.Level.CHUNK_GROUP]
+        for node in overview + sorted(detail, key=lambda node: node.position):
+            context.append({
+                'document': document,
+                'level': node.level,
+                'text': node.text,
+                'page_start': node.page_start,
+                'page_end': node.page_end,
+            })
+    return context
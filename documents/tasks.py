@@ -3,100 +3,648 @@ Document Processing Tasks for AxonFlow AI
 Handles async processing of uploaded documents
 """
 
-from .models import Document
-from .utils import PDFProcessor
-from .openai_client import OpenAIClient
-from .pinecone_client import PineconeClient
+from django.conf import settings
+from django.utils import timezone
+from .circuit_breaker import CircuitBreaker, open_circuits
+from .indexes import active_index, building_indexes
+from .models import (
+    CheckpointPage, ContentArtifact, Document, IngestionCheckpoint, VectorIndex, VectorIndexEntry
+)
+from .utils import PDFProcessor, file_sha256
+from .openai_client import estimate_tokens, get_openai_client
+from .pinecone_client import PineconeClient, get_pinecone_client
+from .rate_limiter import PRIORITY_BULK
+from .summaries import build_summaries
+from usage.ledger import bind_usage, unbind_usage
+from django.db import IntegrityError
+from typing import Dict, Iterable, Iterator, List, Optional
 import logging
+import numpy as np
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Extraction checkpoints are written every this many pages
+CHECKPOINT_EVERY_PAGES = 10
 
-def process_document(document_id: int):
+# Documents process_document is running for in this process
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def update_progress(document_id: int, **counters):
+    """
+    Persist ingestion progress counters without touching other fields
+    
+    Uses a queryset update so progress writes from the processing thread
+    never overwrite concurrent edits to the document row.
+    
+    Args:
+        document_id: ID of document being processed
+        **counters: Progress fields to set (e.g. pages_extracted=3)
+    """
+    Document.objects.filter(id=document_id).update(
+        progress_updated_at=timezone.now(),
+        **counters
+    )
+
+
+def build_vectors(
+    document: Document,
+    chunks: List[Dict],
+    embedding_batches: Iterable[np.ndarray],
+    scheme: Optional[str] = None
+) -> Iterator[Dict]:
+    """
+    Lazily pair chunks with their embeddings as Pinecone vector dicts
+    
+    Args:
+        document: Document the chunks belong to
+        chunks: Chunk dicts from PDFProcessor.process_pdf
+        embedding_batches: float32 embedding arrays in chunk order
+        scheme: Vector ID scheme; defaults to the document's manifest scheme
+        
+    Yields:
+        Vector dicts with 'id', 'values' (a float32 row, converted to a list
+        by PineconeClient when its batch is sent), and 'metadata'
+    """
+    embeddings = (embedding for batch in embedding_batches for embedding in batch)
+    
+    for chunk, embedding in zip(chunks, embeddings):
+        yield {
+            'id': document.vector_id(chunk['chunk_index'], scheme=scheme),
+            'values': embedding,
+            'metadata': {
+                'document_id': document.id,
+                'document_title': document.title,
+                'user_id': document.user_id,
+                'chunk_index': chunk['chunk_index'],
+                'text': chunk['text'],
+                'start_char': chunk['start_char'],
+                'end_char': chunk['end_char'],
+                'page_start': chunk['page_start'],
+                'page_end': chunk['page_end'],
+            }
+        }
+
+
+def check_embedding_compatibility(document: Document, model: str, dimension: int):
+    """
+    Refuse to write vectors that would mix embedding spaces in the index
+    
+    Vectors from different models (or the same model at different
+    dimensions) are not comparable, so similarity search across them
+    returns garbage. The index must be rebuilt before switching models.
+    
+    Args:
+        document: Document about to be (re)embedded; its own vectors are replaced
+        model: Embedding model about to be used
+        dimension: Embedding dimension about to be used
+    """
+    conflicting = (
+        Document.objects.filter(vector_count__gt=0)
+        .exclude(id=document.id)
+        .exclude(embedding_model=model, embedding_dimension=dimension)
+        .values_list('embedding_model', 'embedding_dimension')
+        .first()
+    )
+    if conflicting is not None:
+        raise Exception(
+            f"Index holds {conflicting[0]} ({conflicting[1]}d) vectors; "
+            f"refusing to add {model} ({dimension}d) vectors"
+        )
+
+
+def _collecting(batches: Iterable[np.ndarray], into: List[np.ndarray]) -> Iterator[np.ndarray]:
+    """Pass batches through unchanged, keeping a reference to each in `into`"""
+    for batch in batches:
+        into.append(batch)
+        yield batch
+
+
+def load_checkpoint(document: Document, pdf_processor: PDFProcessor) -> IngestionCheckpoint:
+    """
+    Get the document's ingestion checkpoint, starting fresh if the file or
+    chunk settings changed since it was written
+    
+    Args:
+        document: Document being processed
+        pdf_processor: Processor whose chunk settings the run will use
+        
+    Returns:
+        Saved checkpoint matching the current inputs
+    """
+    if not document.content_hash:
+        with document.file.open('rb') as fh:
+            document.content_hash = file_sha256(fh)
+        document.save(update_fields=['content_hash'])
+    
+    fingerprint = {
+        'content_hash': document.content_hash,
+        'chunk_size': pdf_processor.chunk_size,
+        'chunk_overlap': pdf_processor.chunk_overlap,
+    }
+    
+    checkpoint = IngestionCheckpoint.objects.filter(document=document).first()
+    if checkpoint is not None and checkpoint.matches(**fingerprint):
+        return checkpoint
+    
+    if checkpoint is not None:
+        checkpoint.delete()
+    return IngestionCheckpoint.objects.create(document=document, **fingerprint)
+
+
+def extract_pages(document: Document, pdf_processor: PDFProcessor, checkpoint: IngestionCheckpoint) -> List[str]:
+    """
+    Extract pages not yet in the checkpoint, appending them every few pages
+    
+    Each checkpoint write inserts only the pages extracted since the last
+    one, so checkpointing stays linear in the document size.
+    
+    Args:
+        document: Document being processed
+        pdf_processor: Processor used for extraction
+        checkpoint: Checkpoint to resume from and update in place
+        
+    Returns:
+        Text of every page, in order
+    """
+    page_texts = checkpoint.page_texts()
+    if checkpoint.extraction_complete:
+        update_progress(
+            document.id,
+            pages_extracted=checkpoint.pages_total,
+            pages_total=checkpoint.pages_total
+        )
+        return page_texts
+    
+    def on_page(done, total):
+        checkpoint.pages_total = total
+        update_progress(document.id, pages_extracted=done, pages_total=total)
+    
+    pending = []
+    
+    def flush():
+        CheckpointPage.objects.bulk_create(pending)
+        pending.clear()
+        checkpoint.save(update_fields=['pages_total', 'updated_at'])
+    
+    for page_index, page_text in pdf_processor.iter_pages(
+        document.file.path,
+        start_page=len(page_texts),
+        progress_callback=on_page
+    ):
+        page_texts.append(page_text)
+        pending.append(CheckpointPage(checkpoint=checkpoint, page_index=page_index, text=page_text))
+        if (page_index + 1) % CHECKPOINT_EVERY_PAGES == 0:
+            flush()
+    
+    flush()
+    return page_texts
+
+
+def find_artifact(content_hash: str, index: VectorIndex) -> Optional[ContentArtifact]:
+    """Artifacts of identical content processed for the same chunking and embedding"""
+    if not content_hash:
+        return None
+    return ContentArtifact.objects.filter(
+        content_hash=content_hash,
+        chunk_size=index.chunk_size,
+        chunk_overlap=index.chunk_overlap,
+        embedding_model=index.embedding_model,
+        embedding_dimension=index.embedding_dimension
+    ).first()
+
+
+def save_artifact(content_hash: str, index: VectorIndex, page_texts: List[str],
+                  chunks: List[Dict], embeddings: np.ndarray):
+    """
+    Store processed output for reuse by later uploads of the same content
+    
+    Args:
+        content_hash: SHA-256 of the file
+        index: Index whose chunking and embedding produced the output
+        page_texts: Extracted text per page
+        chunks: Chunk dicts, in chunk order
+        embeddings: float32 matrix with one row per chunk
+    """
+    try:
+        ContentArtifact.objects.create(
+            content_hash=content_hash,
+            chunk_size=index.chunk_size,
+            chunk_overlap=index.chunk_overlap,
+            embedding_model=index.embedding_model,
+            embedding_dimension=index.embedding_dimension,
+            page_texts=page_texts,
+            chunks=[
+                {key: value for key, value in chunk.items() if key not in ContentArtifact.DOCUMENT_FIELDS}
+                for chunk in chunks
+            ],
+            embeddings=np.ascontiguousarray(embeddings, dtype=np.float32).tobytes()
+        )
+    except IntegrityError:
+        # An identical upload processed concurrently stored it first
+        pass
+
+
+def process_document(document_id: int, resume_when_paused: bool = True) -> Optional[Dict]:
     """
     Process uploaded document: extract text, chunk, embed, and store in Pinecone
     
+    Resumable: extracted pages and confirmed upsert batches are checkpointed,
+    so re-running after a failure (or a dead process) skips finished work.
+    Content processed before (same file hash) reuses the stored artifacts
+    and only writes vectors under this document's IDs.
+    
+    If an upstream circuit is open when processing fails, the document is
+    paused (back to PENDING) instead of failed.
+    
     Args:
         document_id: ID of document to process
+        resume_when_paused: Schedule the re-run of a paused document in this
+            process; callers that retry paused documents themselves pass False
+        
+    Returns:
+        Throughput stats ({'pages', 'chunks', 'embedding_tokens'}) on
+        success, None if processing failed
     """
+    # Two runs of one document would race on its manifest, checkpoint and upserts
+    with _in_flight_lock:
+        if document_id in _in_flight:
+            logger.warning(f"Document {document_id} is already being processed")
+            return None
+        _in_flight.add(document_id)
+    
+    usage_token = None
     try:
         # Get document
         document = Document.objects.get(id=document_id)
         
-        # Update status to processing
+        # Attribute embedding usage to this document and its owner
+        usage_token = bind_usage(user_id=document.user_id, document_id=document.id)
+        
+        # Update status to processing and reset progress from earlier runs
         document.processing_status = Document.Status.PROCESSING
+        document.error_message = None
+        document.pages_total = 0
+        document.pages_extracted = 0
+        document.chunks_total = 0
+        document.chunks_embedded = 0
+        document.vectors_upserted = 0
+        document.progress_updated_at = timezone.now()
         document.save()
         
         logger.info(f"Starting processing for document {document_id}: {document.title}")
         
-        # Initialize processors
-        pdf_processor = PDFProcessor(chunk_size=1000, chunk_overlap=200)
-        openai_client = OpenAIClient()
-        pinecone_client = PineconeClient()
+        # Initialize processors for the index that serves reads
+        index = active_index(refresh=True)
+        pdf_processor = PDFProcessor(chunk_size=index.chunk_size, chunk_overlap=index.chunk_overlap)
+        openai_client = get_openai_client(priority=PRIORITY_BULK, embedding=index.embedding)
+        pinecone_client = get_pinecone_client(index)
         
         # Ensure Pinecone index exists
         pinecone_client.create_index_if_not_exists()
         
-        # Process PDF
-        logger.info(f"Extracting and chunking PDF: {document.file.path}")
-        chunks = pdf_processor.process_pdf(
-            pdf_path=document.file.path,
-            document_id=document.id,
-            document_title=document.title
-        )
+        # Resume from a checkpoint left by an interrupted attempt, if valid
+        checkpoint = load_checkpoint(document, pdf_processor)
+        
+        artifact = find_artifact(document.content_hash, index)
+        if artifact is not None:
+            # Identical content was processed before: no extraction needed
+            logger.info(f"Reusing processed artifacts for content {document.content_hash[:12]}")
+            page_texts = artifact.page_texts
+            update_progress(document_id, pages_total=len(page_texts), pages_extracted=len(page_texts))
+            chunks = artifact.chunks_for(document)
+        else:
+            # Extract remaining pages, checkpointing as we go
+            logger.info(f"Extracting and chunking PDF: {document.file.path}")
+            page_texts = extract_pages(document, pdf_processor, checkpoint)
+            chunks = pdf_processor.chunk_pages(page_texts, document.id, document.title)
         
         logger.info(f"Created {len(chunks)} chunks from document")
+        update_progress(document_id, chunks_total=len(chunks))
         
-        # Create embeddings for all chunks
-        logger.info("Generating embeddings...")
-        chunk_texts = [chunk['text'] for chunk in chunks]
-        embeddings = openai_client.create_embeddings_batch(chunk_texts)
-        
-        logger.info(f"Generated {len(embeddings)} embeddings")
-        
-        # Prepare vectors for Pinecone
-        vectors = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            vector = {
-                'id': f"doc_{document.id}_chunk_{i}",
-                'values': embedding,
-                'metadata': {
-                    'document_id': document.id,
-                    'document_title': document.title,
-                    'user_id': document.user.id,
-                    'chunk_index': chunk['chunk_index'],
-                    'text': chunk['text'],
-                    'start_char': chunk['start_char'],
-                    'end_char': chunk['end_char'],
-                }
-            }
-            vectors.append(vector)
+        check_embedding_compatibility(document, openai_client.embedding_model, openai_client.embedding_dimension)
         
-        # Upload to Pinecone
-        logger.info("Uploading vectors to Pinecone...")
-        pinecone_client.upsert_vectors(vectors)
+        # A previous run with more chunks, or one written to another
+        # namespace or with another embedding model, would leave vectors behind
+        namespace = PineconeClient.namespace_for_user(document.user_id)
+        same_embeddings = (
+            document.embedding_model == openai_client.embedding_model
+            and document.embedding_dimension == openai_client.embedding_dimension
+        )
+        if document.vector_namespace != namespace or (document.vector_count and not same_embeddings):
+            stale_ids = document.vector_ids()
+            checkpoint.upserted_ranges = []
+        else:
+            stale_ids = document.vector_ids(start=len(chunks))
+        if stale_ids:
+            logger.info(f"Deleting {len(stale_ids)} stale vectors from a previous run")
+            pinecone_client.delete_by_ids(stale_ids, namespace=document.vector_namespace)
+        
+        # Record the vector manifest before upserting, so even a partial
+        # upload can be deleted by ID
+        document.vector_count = len(chunks)
+        document.vector_id_scheme = Document.VECTOR_ID_SCHEME
+        document.vector_namespace = namespace
+        document.embedding_model = openai_client.embedding_model
+        document.embedding_dimension = openai_client.embedding_dimension
+        document.save(update_fields=[
+            'vector_count', 'vector_id_scheme', 'vector_namespace', 'embedding_model', 'embedding_dimension'
+        ])
+        
+        # Only chunks whose upserts were not confirmed by an earlier attempt
+        confirmed = checkpoint.upserted_indices()
+        pending_chunks = [chunk for chunk in chunks if chunk['chunk_index'] not in confirmed]
+        already_done = len(chunks) - len(pending_chunks)
+        if already_done:
+            logger.info(f"Resuming: {already_done} of {len(chunks)} chunks already stored")
+            update_progress(document_id, chunks_embedded=already_done, vectors_upserted=already_done)
+        
+        def confirm_batch(batch):
+            checkpoint.add_upserted(vector['metadata']['chunk_index'] for vector in batch)
+            checkpoint.save(update_fields=['upserted_ranges', 'updated_at'])
+        
+        # Embed and upload as a pipeline: each embedding batch is packed into
+        # upsert batches and sent while the next batch is being embedded
+        logger.info("Generating embeddings and uploading vectors to Pinecone...")
+        chunk_texts = []
+        collected = []
+        if artifact is not None:
+            embeddings = artifact.embedding_matrix()
+            embedding_batches = [embeddings[[chunk['chunk_index'] for chunk in pending_chunks]]]
+            update_progress(document_id, chunks_embedded=len(chunks))
+        else:
+            chunk_texts = [chunk['text'] for chunk in pending_chunks]
+            embedding_batches = openai_client.iter_embeddings_batch(
+                chunk_texts,
+                progress_callback=lambda done, total: update_progress(
+                    document_id, chunks_embedded=already_done + done
+                )
+            )
+            if not already_done:
+                # Keep this run's embeddings for the artifact store
+                embedding_batches = _collecting(embedding_batches, collected)
+        
+        upserted = pinecone_client.upsert_vectors(
+            build_vectors(document, pending_chunks, embedding_batches),
+            progress_callback=lambda done, total: update_progress(
+                document_id, vectors_upserted=already_done + done
+            ),
+            total=len(pending_chunks),
+            namespace=namespace,
+            batch_callback=confirm_batch
+        )
+        
+        logger.info(f"Embedded and upserted {upserted} vectors")
+        
+        if collected and sum(len(batch) for batch in collected) == len(chunks):
+            save_artifact(document.content_hash, index, page_texts, chunks, np.concatenate(collected))
+        
+        # Dual-write to indexes being rebuilt; a failure here is left for
+        # `rebuild_index build` to backfill rather than failing the document
+        for target in building_indexes():
+            try:
+                write_to_index(
+                    document,
+                    target,
+                    PDFProcessor(target.chunk_size, target.chunk_overlap).chunk_pages(
+                        page_texts, document.id, document.title
+                    )
+                )
+            except Exception as e:
+                logger.error(f"Dual-write of document {document_id} to {target.name} failed: {str(e)}")
         
         # Update document status to completed
+        document.refresh_from_db()
         document.processing_status = Document.Status.COMPLETED
         document.error_message = None
+        document.progress_updated_at = timezone.now()
         document.save()
         
+        # Finished work needs no checkpoint (and its page texts can be large)
+        checkpoint.delete()
+        
+        # Summary tree for overview questions; the document is already
+        # searchable, so a failure here does not fail it
+        if settings.DOCUMENT_SUMMARIES:
+            try:
+                build_summaries(document, chunks, openai_client)
+            except Exception as e:
+                logger.error(f"Summarizing document {document_id} failed: {str(e)}")
+        
         logger.info(f"Successfully processed document {document_id}")
         
+        return {
+            'pages': document.pages_total,
+            'chunks': len(chunks),
+            'embedding_tokens': sum(estimate_tokens(text) for text in chunk_texts),
+        }
+        
     except Document.DoesNotExist:
         logger.error(f"Document {document_id} not found")
         
     except Exception as e:
         logger.error(f"Error processing document {document_id}: {str(e)}")
         
+        # An upstream outage is not the document's fault: requeue it instead
+        circuits = open_circuits()
+        if circuits:
+            pause_document(document_id, circuits, resume=resume_when_paused)
+            return None
+        
         # Update document status to failed
         try:
             document = Document.objects.get(id=document_id)
             document.processing_status = Document.Status.FAILED
             document.error_message = str(e)
+            document.progress_updated_at = timezone.now()
             document.save()
         except:
             pass
+    
+    finally:
+        if usage_token is not None:
+            unbind_usage(usage_token)
+        with _in_flight_lock:
+            _in_flight.discard(document_id)
+
+
+def claim_for_retry(document: Document) -> bool:
+    """
+    Take over a failed or stalled document for a new run, at most once
+    
+    The document moves to PROCESSING only if its status and last progress
+    are still what the caller saw, so concurrent retries (or a run that was
+    only slow, not dead, and has just reported progress) leave it alone.
+    
+    Args:
+        document: Document as loaded by the caller
+        
+    Returns:
+        True if the caller now owns the run and should start process_document
+    """
+    with _in_flight_lock:
+        if document.id in _in_flight:
+            return False
+    return bool(
+        Document.objects.filter(
+            id=document.id,
+            processing_status=document.processing_status,
+            progress_updated_at=document.progress_updated_at
+        ).update(
+            processing_status=Document.Status.PROCESSING,
+            error_message=None,
+            progress_updated_at=timezone.now()
+        )
+    )
+
+
+def pause_document(document_id: int, circuits: List[CircuitBreaker], resume: bool = True) -> float:
+    """
+    Put a document back in the queue while upstream circuits are open
+    
+    The document returns to PENDING with its checkpoint intact and is
+    re-run once the circuits' cooldown ends; its first calls then wait for
+    (or become) the half-open probe, so it resumes only when the dependency
+    answers again.
+    
+    Args:
+        document_id: ID of the document to pause
+        circuits: Breakers that are not closed
+        resume: Schedule the re-run in this process
+        
+    Returns:
+        Seconds until the document should be re-run
+    """
+    names = ', '.join(breaker.name for breaker in circuits)
+    Document.objects.filter(id=document_id).update(
+        processing_status=Document.Status.PENDING,
+        error_message=f"Paused: {names} unavailable; processing resumes automatically",
+        progress_updated_at=timezone.now(),
+    )
+    
+    delay = max(max(breaker.retry_in() for breaker in circuits), 1.0)
+    logger.warning(f"Paused document {document_id} while {names} is unavailable; resuming in {delay:.0f}s")
+    
+    if resume:
+        timer = threading.Timer(delay, process_document, args=(document_id,))
+        timer.daemon = True
+        timer.start()
+    return delay
+
+
+def write_to_index(document: Document, index: VectorIndex, chunks: List[Dict]) -> int:
+    """
+    Embed chunks for a non-active index and record them in its entries
+    
+    Vector IDs are deterministic, so re-running simply overwrites; only IDs
+    beyond a shorter new chunk list need deleting.
+    
+    Args:
+        document: Document the chunks belong to
+        index: Target (BUILDING) index
+        chunks: Chunk dicts produced with the index's chunk settings
+        
+    Returns:
+        Number of vectors written
+    """
+    openai_client = get_openai_client(priority=PRIORITY_BULK, embedding=index.embedding)
+    pinecone_client = get_pinecone_client(index)
+    pinecone_client.create_index_if_not_exists()
+    namespace = PineconeClient.namespace_for_user(document.user_id)
+    
+    previous = VectorIndexEntry.objects.filter(index=index, document=document).first()
+    if previous is not None and previous.vector_count > len(chunks):
+        pinecone_client.delete_by_ids(
+            [document.vector_id(i, scheme=Document.VECTOR_ID_SCHEME)
+             for i in range(len(chunks), previous.vector_count)],
+            namespace=namespace
+        )
+    
+    embedding_batches = openai_client.iter_embeddings_batch([chunk['text'] for chunk in chunks])
+    upserted = pinecone_client.upsert_vectors(
+        build_vectors(document, chunks, embedding_batches, scheme=Document.VECTOR_ID_SCHEME),
+        total=len(chunks),
+        namespace=namespace
+    )
+    
+    VectorIndexEntry.objects.update_or_create(
+        index=index,
+        document=document,
+        defaults={'vector_count': upserted}
+    )
+    return upserted
+
+
+# Metadata every stored vector needs for its chunk to be reused in a rebuild
+CHUNK_METADATA_FIELDS = ('text', 'chunk_index', 'start_char', 'end_char', 'page_start', 'page_end')
+
+
+def backfill_document(document: Document, index: VectorIndex, source: VectorIndex) -> int:
+    """
+    Write a completed document into a BUILDING index
+    
+    Cheapest source first: vectors are copied as-is when chunking and
+    embeddings match the active index, chunk texts stored in the active
+    index are re-embedded when only the embedding changed, and the PDF is
+    re-extracted and re-chunked otherwise.
+    
+    Args:
+        document: A COMPLETED document
+        index: Target (BUILDING) index
+        source: The active index the document's manifest describes
+        
+    Returns:
+        Number of vectors written
+    """
+    same_chunking = (index.chunk_size, index.chunk_overlap) == (source.chunk_size, source.chunk_overlap)
+    
+    stored = {}
+    if same_chunking and document.vector_count:
+        stored = get_pinecone_client(source).fetch_vectors(
+            document.vector_ids(),
+            namespace=document.vector_namespace
+        )
+        complete = len(stored) == document.vector_count and all(
+            all(field in vector['metadata'] for field in CHUNK_METADATA_FIELDS)
+            for vector in stored.values()
+        )
+        if not complete:
+            stored = {}
+    
+    if stored and index.embedding == source.embedding:
+        pinecone_client = get_pinecone_client(index)
+        pinecone_client.create_index_if_not_exists()
+        vectors = [
+            {**vector, 'id': document.vector_id(vector['metadata']['chunk_index'], scheme=Document.VECTOR_ID_SCHEME)}
+            for vector in stored.values()
+        ]
+        upserted = pinecone_client.upsert_vectors(
+            vectors,
+            namespace=PineconeClient.namespace_for_user(document.user_id)
+        )
+        VectorIndexEntry.objects.update_or_create(
+            index=index,
+            document=document,
+            defaults={'vector_count': upserted}
+        )
+        return upserted
+    
+    if stored:
+        chunks = sorted(
+            ({field: vector['metadata'][field] for field in CHUNK_METADATA_FIELDS} for vector in stored.values()),
+            key=lambda chunk: chunk['chunk_index']
+        )
+        for chunk in chunks:
+            for field in ('chunk_index', 'start_char', 'end_char', 'page_start', 'page_end'):
+                chunk[field] = int(chunk[field])
+    else:
+        pdf_processor = PDFProcessor(chunk_size=index.chunk_size, chunk_overlap=index.chunk_overlap)
+        page_texts = [text for _, text in pdf_processor.iter_pages(document.file.path)]
+        chunks = pdf_processor.chunk_pages(page_texts, document.id, document.title)
+    
+    return write_to_index(document, index, chunks)
 
 
 def delete_document_vectors(document_id: int):
@@ -105,14 +653,45 @@ def delete_document_vectors(document_id: int):
     
     Args:
         document_id: ID of document whose vectors to delete
+        
+    Raises:
+        Exception: If a delete fails or its verification finds vectors left,
+            so callers keep the document row (and its manifest) to retry with
     """
     try:
-        pinecone_client = PineconeClient()
-        pinecone_client.delete_by_document_id(document_id)
+        pinecone_client = get_pinecone_client()
+        
+        document = Document.objects.filter(id=document_id).first()
+        if document is not None and document.vector_id_scheme:
+            # Exact, batched ID deletes from the manifest, verified afterwards
+            pinecone_client.delete_by_document_id(
+                document_id,
+                vector_ids=document.vector_ids(),
+                namespace=document.vector_namespace
+            )
+            Document.objects.filter(id=document_id).update(vector_count=0)
+        else:
+            # Documents ingested before manifests were recorded
+            namespace = document.vector_namespace if document is not None else ''
+            pinecone_client.delete_by_document_id(document_id, namespace=namespace)
+        
+        # Copies already written to indexes being rebuilt
+        entries = VectorIndexEntry.objects.filter(
+            document_id=document_id,
+            index__status=VectorIndex.Status.BUILDING
+        ).select_related('index', 'document')
+        for entry in entries:
+            get_pinecone_client(entry.index).delete_by_ids(
+                [entry.document.vector_id(i, scheme=Document.VECTOR_ID_SCHEME) for i in range(entry.vector_count)],
+                namespace=PineconeClient.namespace_for_user(entry.document.user_id)
+            )
+            entry.delete()
+        
         logger.info(f"Deleted vectors for document {document_id}")
         
     except Exception as e:
         logger.error(f"Error deleting vectors for document {document_id}: {str(e)}")
+        raise
 
 
 def reprocess_document(document_id: int):
@@ -123,8 +702,9 @@ def reprocess_document(document_id: int):
         document_id: ID of document to reprocess
     """
     try:
-        # Delete old vectors
+        # Delete old vectors and any partial progress
         delete_document_vectors(document_id)
+        IngestionCheckpoint.objects.filter(document_id=document_id).delete()
         
         # Process again
         process_document(document_id)
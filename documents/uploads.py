@@ -0,0 +1,31 @@
+"""
+Upload handlers for AxonFlow AI
+"""
+
+from django.core.files.uploadhandler import FileUploadHandler
+import hashlib
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Compute each uploaded file's SHA-256 while it streams in
+
+    Runs ahead of Django's memory/temporary-file handlers and passes every
+    chunk on unchanged, so the file is hashed without being read again.
+    Digests are exposed as request.upload_hashes[field_name].
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_hashes'):
+            self.request.upload_hashes = {}
+        self.request.upload_hashes[self.field_name] = self.digest.hexdigest()
+        # Let the next handler build the uploaded file object
+        return None
@@ -5,4 +5,7 @@ urlpatterns = [
     path('', views.document_list, name='document_list'),
     path('upload/', views.upload_document, name='upload_document'),
     path('delete/<int:document_id>/', views.delete_document, name='delete_document'),
+    path('retry/<int:document_id>/', views.retry_document, name='retry_document'),
+    path('status/', views.document_status, name='document_status'),
+    path('status/stream/', views.document_progress_stream, name='document_progress_stream'),
 ]
@@ -4,7 +4,9 @@ Handles PDF text extraction and chunking for RAG system
 """
 
 from pypdf import PdfReader
-from typing import List, Dict
+from typing import BinaryIO, Callable, Iterator, List, Dict, Optional, Tuple
+from bisect import bisect_right
+import hashlib
 import re
 
 
@@ -22,29 +24,63 @@ class PDFProcessor:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
     
-    def extract_text(self, pdf_path: str) -> str:
+    def extract_text(
+        self,
+        pdf_path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> str:
         """
         Extract all text from PDF file
         
         Args:
             pdf_path: Path to PDF file
+            progress_callback: Optional callable receiving (pages_done, total_pages)
             
         Returns:
             Extracted text as string
         """
+        page_texts = [
+            page_text for _, page_text in self.iter_pages(pdf_path, progress_callback=progress_callback)
+        ]
+        return self.join_pages(page_texts)
+    
+    def iter_pages(
+        self,
+        pdf_path: str,
+        start_page: int = 0,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Extract text page by page, optionally resuming part-way through
+        
+        Args:
+            pdf_path: Path to PDF file
+            start_page: Zero-based page to start from (earlier pages are skipped)
+            progress_callback: Optional callable receiving (pages_done, total_pages)
+            
+        Yields:
+            (zero-based page index, page text) tuples; text is '' for pages
+            without extractable text
+        """
         try:
             reader = PdfReader(pdf_path)
-            text = ""
-            
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+            total_pages = len(reader.pages)
             
-            return text.strip()
+            for page_index in range(start_page, total_pages):
+                page_text = reader.pages[page_index].extract_text() or ""
+                
+                if progress_callback:
+                    progress_callback(page_index + 1, total_pages)
+                
+                yield page_index, page_text
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
+    @staticmethod
+    def join_pages(page_texts: List[str]) -> str:
+        """Join per-page texts the way extract_text does"""
+        return "\n".join(text for text in page_texts if text).strip()
+    
     def clean_text(self, text: str) -> str:
         """
         Clean extracted text
@@ -122,7 +158,13 @@ class PDFProcessor:
         
         return chunks
     
-    def process_pdf(self, pdf_path: str, document_id: int, document_title: str) -> List[Dict]:
+    def process_pdf(
+        self,
+        pdf_path: str,
+        document_id: int,
+        document_title: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[Dict]:
         """
         Complete PDF processing pipeline
         
@@ -130,16 +172,114 @@ class PDFProcessor:
             pdf_path: Path to PDF file
             document_id: Database ID of document
             document_title: Title of document
+            progress_callback: Optional callable receiving (pages_done, total_pages)
             
         Returns:
             List of processed chunks with metadata
         """
-        # Extract text
-        raw_text = self.extract_text(pdf_path)
+        page_texts = [
+            page_text for _, page_text in self.iter_pages(pdf_path, progress_callback=progress_callback)
+        ]
+        return self.chunk_pages(page_texts, document_id, document_title)
+    
+    def clean_pages(self, page_texts: List[str]) -> Tuple[str, List[int]]:
+        """
+        Clean page texts and join them, keeping track of where each page starts
+        
+        Pages are cleaned individually and joined with a single space, the
+        same separator cleaning the newline-joined text would produce.
+        
+        Args:
+            page_texts: Raw text of each page, in order
+            
+        Returns:
+            (cleaned text, page_offsets) where page_offsets[i] is the offset
+            in the cleaned text at which page i (zero-based) starts. Pages
+            without text share the offset of the next page with text.
+        """
+        parts = []
+        offsets = []
+        length = 0
+        empty_pages = []
+        
+        for page_text in page_texts:
+            cleaned = self.clean_text(page_text)
+            if not cleaned:
+                empty_pages.append(len(offsets))
+                offsets.append(None)
+                continue
+            
+            start = length + 1 if parts else 0
+            for index in empty_pages:
+                offsets[index] = start
+            empty_pages = []
+            
+            offsets.append(start)
+            parts.append(cleaned)
+            length = start + len(cleaned)
+        
+        for index in empty_pages:
+            offsets[index] = length
+        
+        return ' '.join(parts), offsets
+    
+    @staticmethod
+    def page_range(page_offsets: List[int], start_char: int, end_char: int) -> Tuple[int, int]:
+        """
+        Map a character span of the cleaned text to 1-based page numbers
+        
+        Args:
+            page_offsets: Offsets from clean_pages
+            start_char: Span start
+            end_char: Span end (exclusive)
+            
+        Returns:
+            (first page, last page), both 1-based
+        """
+        if not page_offsets:
+            return 1, 1
+        first = max(bisect_right(page_offsets, start_char), 1)
+        last = max(bisect_right(page_offsets, max(end_char - 1, start_char)), first)
+        return first, last
+    
+    def chunk_pages(self, page_texts: List[str], document_id: int, document_title: str) -> List[Dict]:
+        """
+        Clean and chunk already-extracted page texts
         
-        # Clean text
-        cleaned_text = self.clean_text(raw_text)
+        Deterministic for the same pages and chunk settings, which lets a
+        resumed ingestion rebuild exactly the chunks of an earlier attempt.
         
+        Args:
+            page_texts: Text of each page, in order
+            document_id: Database ID of document
+            document_title: Title of document
+            
+        Returns:
+            List of processed chunks with metadata, including page_start and
+            page_end
+        """
+        cleaned_text, page_offsets = self.clean_pages(page_texts)
+        return self.chunk_cleaned_pages(cleaned_text, page_offsets, document_id, document_title)
+    
+    def chunk_cleaned_pages(
+        self,
+        cleaned_text: str,
+        page_offsets: List[int],
+        document_id: int,
+        document_title: str
+    ) -> List[Dict]:
+        """
+        Chunk cleaned text and tag each chunk with the pages it spans
+        
+        Args:
+            cleaned_text: Text from clean_pages
+            page_offsets: Offsets from clean_pages
+            document_id: Database ID of document
+            document_title: Title of document
+            
+        Returns:
+            List of processed chunks with metadata
+        """
         # Create metadata
         metadata = {
             'document_id': document_id,
@@ -149,6 +289,12 @@ class PDFProcessor:
         # Chunk text
         chunks = self.chunk_text(cleaned_text, metadata)
         
+        # Binary search the page offsets for each chunk's span
+        for chunk in chunks:
+            chunk['page_start'], chunk['page_end'] = self.page_range(
+                page_offsets, chunk['start_char'], min(chunk['end_char'], len(cleaned_text))
+            )
+        
         return chunks
 
 
@@ -167,3 +313,20 @@ def extract_page_numbers(pdf_path: str) -> int:
         return len(reader.pages)
     except Exception as e:
         raise Exception(f"Error reading PDF: {str(e)}")
+
+
+def file_sha256(file_obj: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file, reading it in chunks
+    
+    Args:
+        file_obj: Binary file-like object; read from its current position
+        chunk_size: Bytes read per iteration
+        
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    for block in iter(lambda: file_obj.read(chunk_size), b''):
+        digest.update(block)
+    return digest.hexdigest()
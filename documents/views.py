@@ -1,10 +1,24 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import JsonResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from .circuit_breaker import circuit_states
 from .models import Document
 from .forms import DocumentForm
-from .tasks import process_document, delete_document_vectors
+from .tasks import claim_for_retry, process_document, delete_document_vectors
+from .warmup import ensure_warming, readiness_state
+import hashlib
+import json
 import threading
+import time
+
+PROGRESS_FIELDS = [
+    'id', 'processing_status', 'error_message', 'pages_total', 'pages_extracted',
+    'chunks_total', 'chunks_embedded', 'vectors_upserted', 'progress_updated_at',
+]
 
 @login_required
 def document_list(request):
@@ -18,6 +32,13 @@ def upload_document(request):
         if form.is_valid():
             doc = form.save(commit=False)
             doc.user = request.user
+            
+            # Hashed while streaming (documents.uploads); identical content is
+            # stored once and its processed artifacts are reused
+            doc.content_hash = getattr(request, 'upload_hashes', {}).get('file', '')
+            existing_file = _stored_file_name(doc.content_hash)
+            if existing_file:
+                doc.file = existing_file
             doc.save()
             
             # Trigger processing in background thread
@@ -30,6 +51,24 @@ def upload_document(request):
         form = DocumentForm()
     return render(request, 'documents/upload.html', {'form': form})
 
+@login_required
+@require_POST
+def retry_document(request, document_id):
+    """Resume processing of a failed (or stalled) document from its checkpoint"""
+    document = get_object_or_404(Document, id=document_id, user=request.user)
+    
+    # Paused documents count too: their scheduled resume dies with the process.
+    # The claim keeps a double click (or a slow live run) from starting twice
+    if document.is_retryable and claim_for_retry(document):
+        thread = threading.Thread(target=process_document, args=(document.id,))
+        thread.start()
+        messages.success(request, f'Resuming processing of "{document.title}".')
+    else:
+        messages.warning(request, f'"{document.title}" is not in a retryable state.')
+    
+    return redirect('document_list')
+
+
 @login_required
 def delete_document(request, document_id):
     document = get_object_or_404(Document, id=document_id, user=request.user)
@@ -37,11 +76,17 @@ def delete_document(request, document_id):
     if request.method == 'POST':
         title = document.title
         
-        # Delete vectors from Pinecone
+        # Delete vectors from Pinecone; the row holds the manifest needed to
+        # retry, so it stays until they are confirmed gone
         try:
             delete_document_vectors(document.id)
         except Exception as e:
-            messages.warning(request, f'Could not delete vectors: {str(e)}')
+            messages.error(
+                request,
+                f'Could not delete the vectors of "{title}", so the document was kept. '
+                f'Please try again. ({str(e)})'
+            )
+            return redirect('document_list')
         
         # Delete document
         document.delete()
@@ -50,3 +95,156 @@ def delete_document(request, document_id):
     
     return render(request, 'documents/delete_confirm.html', {'document': document})
 
+
+def _stored_file_name(content_hash):
+    """Storage name of an already uploaded file with this content, if any"""
+    if not content_hash:
+        return None
+    
+    for name in (
+        Document.objects.filter(content_hash=content_hash)
+        .exclude(file='')
+        .order_by('id')
+        .values_list('file', flat=True)
+    ):
+        if default_storage.exists(name):
+            return name
+    return None
+
+
+def _progress_snapshot(user, document_ids=None):
+    """Progress dicts for a user's documents, loading only the counter columns"""
+    documents = Document.objects.filter(user=user).only(*PROGRESS_FIELDS).order_by('-uploaded_at')
+    if document_ids is not None:
+        documents = documents.filter(id__in=document_ids)
+    return [doc.progress_dict() for doc in documents]
+
+
+def _parse_ids(request):
+    """Parse an optional ?ids=1,2,3 query parameter"""
+    raw = request.GET.get('ids')
+    if not raw:
+        return None
+    return [int(value) for value in raw.split(',') if value.strip().isdigit()]
+
+
+@login_required
+@require_GET
+def document_status(request):
+    """
+    Progress snapshot for the user's documents as JSON
+    
+    Supports conditional GET: the response carries an ETag derived from the
+    progress counters and a matching If-None-Match returns 304 with no body.
+    """
+    snapshot = _progress_snapshot(request.user, _parse_ids(request))
+    body = json.dumps({'documents': snapshot}, sort_keys=True)
+    etag = '"%s"' % hashlib.md5(body.encode('utf-8')).hexdigest()
+    
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'documents': snapshot})
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_GET
+def document_progress_stream(request):
+    """
+    Server-Sent Events stream of ingestion progress
+    
+    Watches the documents that are pending or processing when the stream is
+    opened, emits a `progress` event whenever one of them changes and a
+    final `done` event once all of them have finished.
+    
+    Each response lasts at most DOCUMENT_PROGRESS_STREAM_TIMEOUT, since it
+    holds a worker meanwhile. When that runs out while documents are still
+    active, the response just ends and the browser reconnects after the
+    `retry` interval.
+    """
+    user = request.user
+    document_ids = _parse_ids(request)
+    if document_ids is None:
+        document_ids = list(
+            Document.objects.filter(
+                user=user,
+                processing_status__in=[Document.Status.PENDING, Document.Status.PROCESSING]
+            ).values_list('id', flat=True)
+        )
+    
+    interval = settings.DOCUMENT_PROGRESS_POLL_INTERVAL
+    max_duration = settings.DOCUMENT_PROGRESS_STREAM_TIMEOUT
+    
+    def event_stream():
+        last_sent = {}
+        deadline = time.monotonic() + max_duration
+        yield f"retry: {int(interval * 1000)}\n\n"
+        
+        while document_ids and time.monotonic() < deadline:
+            snapshot = _progress_snapshot(user, document_ids)
+            for item in snapshot:
+                if last_sent.get(item['id']) != item:
+                    last_sent[item['id']] = item
+                    yield f"event: progress\ndata: {json.dumps(item)}\n\n"
+            
+            active = [
+                item for item in snapshot
+                if item['status'] in (Document.Status.PENDING, Document.Status.PROCESSING)
+            ]
+            if not active:
+                break
+            
+            # Comment line keeps intermediaries from closing an idle connection
+            yield ": keep-alive\n\n"
+            time.sleep(interval)
+        else:
+            if document_ids:
+                # Out of time with documents still active: end without `done`
+                return
+        
+        yield "event: done\ndata: {}\n\n"
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+def readiness(request):
+    """
+    Readiness probe: 200 once this worker has warmed up, 503 while cold
+    
+    A cold worker starts warming itself on the first probe. Unauthenticated
+    so orchestrators can call it; reports only check names and pass/fail,
+    never error details.
+    """
+    ensure_warming()
+    state = readiness_state()
+    body = {
+        'status': 'warm' if state['warm'] else 'cold',
+        'checks': {name: result == 'ok' for name, result in state['checks'].items()},
+        'warmed_at': state['warmed_at'],
+    }
+    return JsonResponse(body, status=200 if state['warm'] else 503)
+
+
+@require_GET
+def circuits(request):
+    """
+    Circuit breaker state of this worker's upstream dependencies
+    
+    Unauthenticated like the readiness probe; always 200, since an open
+    circuit pauses ingestion rather than making the worker unready.
+    """
+    return JsonResponse({
+        'circuits': circuit_states(),
+        'paused_documents': Document.objects.filter(
+            processing_status=Document.Status.PENDING,
+            error_message__startswith='Paused:'
+        ).count(),
+    })
@@ -0,0 +1,111 @@
+"""
+Worker Warmup for AxonFlow AI
+Pre-builds API clients and verifies upstream services before serving traffic
+"""
+
+from django.conf import settings
+from django.utils import timezone
+from .indexes import active_index
+from .openai_client import get_openai_client
+from .pinecone_client import get_pinecone_client
+from .rate_limiter import PRIORITY_BULK, get_rate_limiter
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_state = {
+    'warm': False,
+    'checks': {},
+    'warmed_at': None,
+}
+_state_lock = threading.Lock()
+_warming = {'thread': None, 'started_at': 0.0}
+
+# A failed warmup is retried by the readiness probe at most this often (seconds)
+WARMUP_RETRY_INTERVAL = 10.0
+
+
+def warm_up() -> dict:
+    """
+    Build shared clients, open connection pools and verify the index
+    
+    Every check runs even if an earlier one fails, so the returned state
+    shows all problems at once. The worker is considered warm only when all
+    checks pass.
+    
+    Returns:
+        Readiness state: {'warm': bool, 'checks': {name: 'ok' | error}, 'warmed_at': iso}
+    """
+    checks = {}
+    
+    def check(name, func):
+        try:
+            func()
+            checks[name] = 'ok'
+        except Exception as e:
+            logger.warning(f"Warmup check {name} failed: {str(e)}")
+            checks[name] = str(e)
+    
+    def openai_ready():
+        embedding = active_index().embedding
+        client = get_openai_client(embedding=embedding)
+        get_openai_client(priority=PRIORITY_BULK, embedding=embedding)
+        # Cheap authenticated call that also opens the pooled connection
+        client.client.models.retrieve(client.embedding_model)
+    
+    def pinecone_ready():
+        client = get_pinecone_client()
+        client.create_index_if_not_exists()
+        client.get_stats()
+    
+    check('rate_limiter', get_rate_limiter)
+    check('openai', openai_ready)
+    check('pinecone', pinecone_ready)
+    
+    with _state_lock:
+        _state['checks'] = checks
+        _state['warm'] = all(result == 'ok' for result in checks.values())
+        _state['warmed_at'] = timezone.now().isoformat()
+        return dict(_state)
+
+
+def warm_up_in_background():
+    """Run warm_up in a daemon thread so startup is not blocked"""
+    with _state_lock:
+        _warming['started_at'] = time.monotonic()
+        _warming['thread'] = thread = threading.Thread(target=warm_up, name='axonflow-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def ensure_warming():
+    """
+    Start a background warmup unless this worker is warm or already warming
+    
+    Called by the readiness probe, so a worker started without
+    WARMUP_ON_STARTUP (or whose startup warmup failed) warms itself on the
+    first probes instead of staying cold forever.
+    """
+    with _state_lock:
+        if _state['warm']:
+            return
+        thread = _warming['thread']
+        if thread is not None and thread.is_alive():
+            return
+        if thread is not None and time.monotonic() - _warming['started_at'] < WARMUP_RETRY_INTERVAL:
+            return
+        _warming['started_at'] = time.monotonic()
+        _warming['thread'] = thread = threading.Thread(target=warm_up, name='axonflow-warmup', daemon=True)
+    thread.start()
+
+
+def readiness_state() -> dict:
+    """Current readiness state; cold until warm_up has succeeded in this process"""
+    with _state_lock:
+        return dict(_state)
+
+
+def should_warm_on_startup() -> bool:
+    return settings.WARMUP_ON_STARTUP
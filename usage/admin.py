@@ -0,0 +1,24 @@
+from django.contrib import admin
+from .models import DailyUsage, UsageEvent
+
+
+@admin.register(DailyUsage)
+class DailyUsageAdmin(admin.ModelAdmin):
+    list_display = ['date', 'user', 'stage', 'model', 'requests', 'total_tokens', 'average_latency_ms']
+    list_filter = ['date', 'stage', 'model']
+    search_fields = ['user__username']
+    ordering = ['-date', '-total_tokens']
+
+
+@admin.register(UsageEvent)
+class UsageEventAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'user', 'stage', 'document', 'session', 'total_tokens', 'latency_ms']
+    list_filter = ['stage', 'model', 'created_at']
+    search_fields = ['user__username', 'document__title']
+
+    # The ledger is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
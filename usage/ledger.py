@@ -0,0 +1,140 @@
+"""
+Usage Ledger for AxonFlow AI
+Records OpenAI token usage per call and maintains daily rollups
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import DailyUsage, UsageEvent
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Who the current OpenAI calls should be attributed to
+_scope = ContextVar('usage_scope', default={})
+
+
+def bind_usage(**fields):
+    """
+    Attribute subsequent OpenAI calls in this context to user/document/session
+
+    Args:
+        **fields: Any of user_id, document_id, session_id
+
+    Returns:
+        Token to pass to unbind_usage
+    """
+    return _scope.set({**_scope.get(), **fields})
+
+
+def unbind_usage(token):
+    _scope.reset(token)
+
+
+@contextmanager
+def usage_scope(**fields):
+    """Context manager form of bind_usage/unbind_usage"""
+    token = bind_usage(**fields)
+    try:
+        yield
+    finally:
+        unbind_usage(token)
+
+
+def attribute_usage(view):
+    """View decorator attributing usage to the requesting user and the URL's session_id"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user_id = request.user.id if request.user.is_authenticated else None
+        with usage_scope(user_id=user_id, session_id=kwargs.get('session_id')):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def record_usage(stage, model, usage, latency_ms):
+    """
+    Append a ledger entry and fold it into today's rollup
+
+    Never raises: accounting problems are logged rather than failing the
+    API call they describe.
+
+    Args:
+        stage: UsageEvent.Stage value
+        model: Model name the call used
+        usage: The `usage` object from the OpenAI response (may be None)
+        latency_ms: Wall-clock duration of the call
+    """
+    try:
+        scope = _scope.get()
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        total_tokens = getattr(usage, 'total_tokens', 0) or (prompt_tokens + completion_tokens)
+        latency_ms = int(latency_ms)
+
+        with transaction.atomic():
+            UsageEvent.objects.create(
+                user_id=scope.get('user_id'),
+                document_id=scope.get('document_id'),
+                session_id=scope.get('session_id'),
+                stage=stage,
+                model=model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=total_tokens,
+                latency_ms=latency_ms,
+            )
+            _increment_daily(
+                scope.get('user_id'), stage, model,
+                prompt_tokens, completion_tokens, total_tokens, latency_ms
+            )
+    except Exception as e:
+        logger.error(f"Error recording usage: {str(e)}")
+
+
+def _increment_daily(user_id, stage, model, prompt_tokens, completion_tokens, total_tokens, latency_ms):
+    """Increment today's rollup row in place, creating it on first use"""
+    key = {'date': timezone.localdate(), 'user_id': user_id, 'stage': stage, 'model': model}
+    increments = {
+        'requests': F('requests') + 1,
+        'prompt_tokens': F('prompt_tokens') + prompt_tokens,
+        'completion_tokens': F('completion_tokens') + completion_tokens,
+        'total_tokens': F('total_tokens') + total_tokens,
+        'total_latency_ms': F('total_latency_ms') + latency_ms,
+    }
+
+    if DailyUsage.objects.filter(**key).update(**increments):
+        return
+
+    try:
+        with transaction.atomic():
+            DailyUsage.objects.create(
+                **key,
+                requests=1,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=total_tokens,
+                total_latency_ms=latency_ms,
+            )
+    except IntegrityError:
+        # Another worker created the row first
+        DailyUsage.objects.filter(**key).update(**increments)
+
+
+def tokens_used_today(user_id):
+    """Total tokens a user has consumed today, from the rollup table"""
+    totals = DailyUsage.objects.filter(
+        date=timezone.localdate(),
+        user_id=user_id
+    ).aggregate(total=Sum('total_tokens'))
+    return totals['total'] or 0
+
+
+def is_over_quota(user_id):
+    """Whether the user has exhausted USER_DAILY_TOKEN_QUOTA (0 disables quotas)"""
+    quota = settings.USER_DAILY_TOKEN_QUOTA
+    return bool(quota) and tokens_used_today(user_id) >= quota
@@ -0,0 +1,36 @@
+# Generated by Django 6.0
+
+from django.db import migrations, models
+
+COUNTERS = ['requests', 'prompt_tokens', 'completion_tokens', 'total_tokens', 'total_latency_ms']
+
+
+def merge_unattributed(apps, schema_editor):
+    # Concurrent first writes could each create an unattributed row
+    DailyUsage = apps.get_model('usage', 'DailyUsage')
+    kept = {}
+    for row in DailyUsage.objects.filter(user__isnull=True).order_by('id'):
+        key = (row.date, row.stage, row.model)
+        if key not in kept:
+            kept[key] = row
+            continue
+        target = kept[key]
+        for field in COUNTERS:
+            setattr(target, field, getattr(target, field) + getattr(row, field))
+        target.save(update_fields=COUNTERS)
+        row.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usage', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_unattributed, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('date', 'stage', 'model'), name='unique_daily_usage_unattributed'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+from django.db import models
+from django.conf import settings
+
+
+class UsageEvent(models.Model):
+    """Append-only ledger entry for one OpenAI API call"""
+
+    class Stage(models.TextChoices):
+        INGEST_EMBEDDING = 'INGEST_EMBEDDING', 'Ingestion embedding'
+        QUERY_EMBEDDING = 'QUERY_EMBEDDING', 'Query embedding'
+        COMPLETION = 'COMPLETION', 'Chat completion'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='usage_events'
+    )
+    document = models.ForeignKey(
+        'documents.Document',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='usage_events'
+    )
+    session = models.ForeignKey(
+        'chat.ChatSession',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='usage_events'
+    )
+    stage = models.CharField(max_length=20, choices=Stage.choices)
+    model = models.CharField(max_length=100)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    total_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.stage} {self.total_tokens} tokens"
+
+
+class DailyUsage(models.Model):
+    """
+    Per-day, per-user, per-stage totals, incremented as events are recorded
+
+    Dashboards and quota checks read these rows instead of scanning the ledger.
+    """
+
+    date = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_usage'
+    )
+    stage = models.CharField(max_length=20, choices=UsageEvent.Stage.choices)
+    model = models.CharField(max_length=100)
+    requests = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    total_tokens = models.PositiveBigIntegerField(default=0)
+    total_latency_ms = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', '-total_tokens']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'user', 'stage', 'model'], name='unique_daily_usage'),
+            # NULLs are distinct in the constraint above, so unattributed
+            # usage needs its own (nulls_distinct is PostgreSQL-only)
+            models.UniqueConstraint(
+                fields=['date', 'stage', 'model'],
+                condition=models.Q(user__isnull=True),
+                name='unique_daily_usage_unattributed'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.user} {self.stage}: {self.total_tokens} tokens"
+
+    @property
+    def average_latency_ms(self):
+        return self.total_latency_ms // self.requests if self.requests else 0